@@ -0,0 +1,402 @@
+"""
+読み上げ経路 (キュー -> 合成 -> rust_core -> 連続再生ソース) のスループット計測．
+
+使い方 (リポジトリのルートで実行, rust_core はビルド済みであること):
+    python benchmarks/bench_audio.py [--engine voicevox|aivoice] [--guilds 1 10 100]
+                                     [--utterances 5] [--latency-ms 50]
+                                     [--degraded-latency-ms 2000]
+
+実際のエンジンや Discord には接続しない．
+- voicevox: ローカルに立てた偽の VOICEVOX HTTP サーバーへ
+  本物の VoicevoxProvider で接続する
+- aivoice: 一定時間待ってから用意済みの WAV を書き出す偽の A.I.VOICE プロバイダー
+再生側は 20ms ごとにフレームを読み出す (実時間で消費する) 偽のボイスクライアントを使う．
+--degraded-latency-ms を指定すると、その時間かかる偽の A.I.VOICE をメイン、
+--engine のエンジンを予備にした CompositeProvider で計測する
+(ヘッジは環境変数 TTS_HEDGE_AFTER_MS で有効にする)．
+
+ギルド数ごとに utterances/sec, 最初のフレームまでの時間 (p50 / p99),
+ギルドあたりのメモリ (tracemalloc のピーク) を表示する．
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import pathlib
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import wave
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import settings  # noqa: E402
+from cogs.audio import AudioSystem  # noqa: E402
+from cogs.audio_source import FRAME_SIZE  # noqa: E402
+from cogs.dsp import rust_core  # noqa: E402
+from cogs.tts_engines.base import TTSProvider  # noqa: E402
+from cogs.tts_engines.composite import CompositeProvider  # noqa: E402
+from cogs.tts_engines.voicevox import VoicevoxProvider  # noqa: E402
+
+FRAME_SEC = 0.02
+
+
+def make_wav(seconds: float, rate: int = 24000, channels: int = 1) -> bytes:
+    """エンジンの出力を模した 16bit の WAV (440Hz の正弦波)"""
+    frames = int(seconds * rate)
+    samples = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate))) * channels
+        for i in range(frames)
+    )
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples)
+    return buf.getvalue()
+
+
+# --- 偽のエンジン ---
+
+
+class FakeVoicevoxServer:
+    """
+    VOICEVOX Engine の /speakers, /audio_query, /synthesis, /multi_synthesis だけを返す
+    HTTP サーバー．
+    synthesis は AudioQuery の outputSamplingRate / outputStereo に合わせた WAV を返す．
+    """
+
+    def __init__(self, seconds: float, latency: float):
+        wavs = {}
+
+        def wav_for(query: dict) -> bytes:
+            key = (
+                int(query.get("outputSamplingRate", 24000)),
+                2 if query.get("outputStereo") else 1,
+            )
+            if key not in wavs:
+                wavs[key] = make_wav(seconds, *key)
+            return wavs[key]
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: bytes, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                speakers = [
+                    {"name": "ベンチ", "styles": [{"name": "ノーマル", "id": 3}]}
+                ]
+                self._send(json.dumps(speakers).encode(), "application/json")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                # 合成にかかる時間を audio_query と synthesis に半分ずつ割り当てる
+                time.sleep(latency / 2)
+                if self.path.startswith("/audio_query"):
+                    self._send(b"{}", "application/json")
+                elif self.path.startswith("/multi_synthesis"):
+                    buf = io.BytesIO()
+                    with zipfile.ZipFile(buf, "w") as archive:
+                        for i, query in enumerate(json.loads(body), 1):
+                            archive.writestr(f"{i:03}.wav", wav_for(query))
+                    self._send(buf.getvalue(), "application/zip")
+                else:
+                    self._send(wav_for(json.loads(body or b"{}")), "audio/wav")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeAIVoiceProvider(TTSProvider):
+    """A.I.VOICE Editor の代わりに、一定時間待って用意済みの WAV を書き出す"""
+
+    def __init__(self, wav: bytes, latency: float):
+        self.wav = wav
+        self.latency = latency
+        # エディタは1つなので同時には合成できない
+        self._editor = threading.Lock()
+
+    def initialize(self):
+        pass
+
+    def generate_audio(self, text, emotion, output_path, cancel_token=None):
+        with self._editor:
+            time.sleep(self.latency)
+            with open(output_path, "wb") as f:
+                f.write(self.wav)
+
+    def get_presets(self):
+        return ["ベンチ"]
+
+    def set_preset(self, preset_name):
+        return True
+
+    def terminate(self):
+        pass
+
+
+# --- 偽の Discord ---
+
+
+class NullGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.voice_client = None
+
+
+class NullVoiceClient:
+    """送信はせず、discord.py の AudioPlayer と同じく 20ms ごとにフレームを読み出す"""
+
+    def __init__(self, guild_id):
+        self.guild = NullGuild(guild_id)
+        self.guild.voice_client = self
+        self.frames = 0
+        self._playing = False
+        self._stop = threading.Event()
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self._playing
+
+    def stop(self):
+        self._stop.set()
+
+    def play(self, source, *, after=None):
+        if self._playing:
+            raise RuntimeError("Already playing audio.")
+        self._playing = True
+        self._stop.clear()
+        threading.Thread(target=self._run, args=(source, after), daemon=True).start()
+
+    def _run(self, source, after):
+        start = time.perf_counter()
+        loops = 0
+        while not self._stop.is_set():
+            frame = source.read()
+            if not frame:
+                break
+            assert len(frame) == FRAME_SIZE
+            self.frames += 1
+            loops += 1
+            delay = start + FRAME_SEC * loops - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self._playing = False
+        if after:
+            after(None)
+
+
+class NullBot:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def wait_until_ready(self):
+        pass
+
+    def is_closed(self):
+        return False
+
+    def get_guild(self, guild_id):
+        return None
+
+
+class BenchAudioSystem(AudioSystem):
+    """再生に渡った発話の UtteranceTrace を集める"""
+
+    def __init__(self, bot, tts_provider):
+        super().__init__(bot, tts_provider=tts_provider)
+        self.traces = []
+
+    def play_clip(self, state, vc_client, pcm, trace=None, first=True, last=True):
+        if trace is not None and first:
+            self.traces.append(trace)
+        return super().play_clip(state, vc_client, pcm, trace, first, last)
+
+
+# --- 計測 ---
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def make_provider(args, wav, server):
+    latency = args.latency_ms / 1000
+    if args.engine == "voicevox":
+        provider = VoicevoxProvider()
+        provider.base_url = server.url
+    else:
+        provider = FakeAIVoiceProvider(wav, latency)
+    if args.degraded_latency_ms:
+        # 遅くなったメインのエンジンと、正常な予備のエンジン
+        degraded = FakeAIVoiceProvider(wav, args.degraded_latency_ms / 1000)
+        return CompositeProvider("degraded", args.engine, degraded, provider)
+    return provider
+
+
+async def run_scenario(args, wav, server, guilds: int, measure_memory: bool):
+    settings.TTS_ENGINE = args.engine
+    # 計測中に溢れて捨てられないようにする
+    settings.SPEECH_QUEUE_MAX_PER_GUILD = max(
+        getattr(settings, "SPEECH_QUEUE_MAX_PER_GUILD", 20), args.utterances
+    )
+    bot = NullBot()
+    system = BenchAudioSystem(bot, make_provider(args, wav, server))
+    await system.prepare_engine()
+    clients = [NullVoiceClient(10_000 + i) for i in range(guilds)]
+
+    if measure_memory:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+
+    started = time.perf_counter()
+    for n in range(args.utterances):
+        for vc in clients:
+            system.enqueue_speech(
+                vc, f"ベンチマーク用の読み上げ {n} 番目です。", "NORMAL"
+            )
+
+    await asyncio.gather(
+        *(state.speech_queue.join() for state in system.guilds.values())
+    )
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+
+    first_frames = [
+        t.first_frame_at - t.enqueued_at
+        for t in system.traces
+        if t.first_frame_at is not None
+    ]
+    system.cog_unload()
+    # 再生スレッドが after を呼び終えるのを待つ
+    await asyncio.sleep(0.1)
+
+    return {
+        "guilds": guilds,
+        "utterances": len(first_frames),
+        "elapsed_sec": elapsed,
+        "utterances_per_sec": len(first_frames) / elapsed if elapsed else 0.0,
+        "ttff_p50_ms": percentile(first_frames, 0.5) * 1000,
+        "ttff_p99_ms": percentile(first_frames, 0.99) * 1000,
+        "memory_per_guild_kib": peak / guilds / 1024 if peak is not None else None,
+    }
+
+
+async def main_async(args):
+    wav = make_wav(args.clip_sec)
+    server = (
+        FakeVoicevoxServer(args.clip_sec, args.latency_ms / 1000)
+        if args.engine == "voicevox"
+        else None
+    )
+    results = []
+    try:
+        for guilds in args.guilds:
+            result = await run_scenario(args, wav, server, guilds, False)
+            if not args.no_memory:
+                # tracemalloc は処理を遅くするため、メモリは別の実行で計測する
+                memory = await run_scenario(args, wav, server, guilds, True)
+                result["memory_per_guild_kib"] = memory["memory_per_guild_kib"]
+            results.append(result)
+    finally:
+        if server:
+            server.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--engine", choices=["voicevox", "aivoice"], default="voicevox")
+    parser.add_argument("--guilds", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument(
+        "--utterances", type=int, default=5, help="ギルドあたりの発話数"
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=50, help="偽エンジンの合成時間"
+    )
+    parser.add_argument(
+        "--clip-sec", type=float, default=0.5, help="偽エンジンが返す音声の長さ"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="メモリ計測の実行を省略する"
+    )
+    parser.add_argument(
+        "--degraded-latency-ms",
+        type=float,
+        default=0,
+        help="遅くなったメインのエンジンの合成時間 (予備への切り替えを計測する)",
+    )
+    parser.add_argument("--json", action="store_true", help="結果をJSONで出力する")
+    args = parser.parse_args()
+
+    if not hasattr(rust_core, "process_audio_pipeline"):
+        sys.exit(
+            "rust_core is not built. "
+            "Run `maturin develop --release` in rust_core/ first."
+        )
+
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"engine={args.engine} latency={args.latency_ms:.0f}ms "
+        f"clip={args.clip_sec}s utterances/guild={args.utterances}"
+        + (
+            f" degraded={args.degraded_latency_ms:.0f}ms"
+            if args.degraded_latency_ms
+            else ""
+        )
+    )
+    print(
+        f"{'guilds':>6} {'utt/s':>8} {'ttff p50':>10} {'ttff p99':>10} "
+        f"{'KiB/guild':>10}"
+    )
+    for r in results:
+        memory = (
+            f"{r['memory_per_guild_kib']:10.1f}"
+            if r["memory_per_guild_kib"] is not None
+            else f"{'-':>10}"
+        )
+        print(
+            f"{r['guilds']:>6} {r['utterances_per_sec']:8.2f}"
+            f" {r['ttff_p50_ms']:8.0f}ms {r['ttff_p99_ms']:8.0f}ms {memory}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+感情タグ解析のマイクロベンチマーク．
+
+使い方 (リポジトリのルートで実行):
+    python benchmarks/bench_emotions.py [--number 20000]
+
+旧実装 (呼び出しごとに re.search / re.sub / re.split を繰り返す版) と
+現在の cogs.consts の実装を同じ入力で比較する．
+"""
+
+import argparse
+import pathlib
+import re
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from cogs.consts import (  # noqa: E402
+    TAG_PATTERN,
+    EmotionStreamParser,
+    extract_emotion,
+    parse_emotions,
+    tokenize_emotions,
+)
+
+SAMPLES = {
+    "short": "{time}にアラームをセットしました。[NORMAL]",
+    "no_tag": "タグのない普通のメッセージです。" * 3,
+    "llm_reply": (
+        "こんにちは！今日はいい天気ですね。[JOY]"
+        "でも午後から雨が降るみたいです……【SAD】"
+        "傘を忘れないでくださいね！(ANGRY)"
+        "それじゃあ、いってらっしゃい。[NORMAL]"
+    )
+    * 4,
+}
+
+
+def legacy_extract_emotion(text):
+    match = re.search(TAG_PATTERN, text)
+    emotion = "JOY"
+    clean_text = text
+    if match:
+        emo_match = re.search(r"[A-Z]+", match.group())
+        if emo_match:
+            emotion = emo_match.group()
+        clean_text = re.sub(TAG_PATTERN, "", text).strip()
+    return clean_text, emotion
+
+
+def legacy_parse_emotions(text):
+    parts = re.split(f"({TAG_PATTERN})", text)
+    segments = []
+    buffer_text = ""
+    for part in parts:
+        if re.match(TAG_PATTERN, part):
+            emotion_match = re.search(r"[A-Z]+", part)
+            if emotion_match:
+                if buffer_text.strip():
+                    segments.append((buffer_text.strip(), emotion_match.group()))
+                buffer_text = ""
+        else:
+            buffer_text += part
+    if buffer_text.strip():
+        last_emotion = segments[-1][1] if segments else "NORMAL"
+        segments.append((buffer_text.strip(), last_emotion))
+    return segments
+
+
+def legacy_chat_path(text):
+    # 旧 chat.py: 同じ応答に対して extract_emotion と parse_emotions を両方実行
+    return legacy_extract_emotion(text), legacy_parse_emotions(text)
+
+
+def stream_parse(text, chunk_size=8):
+    parser = EmotionStreamParser()
+    segments = []
+    for i in range(0, len(text), chunk_size):
+        segments.extend(parser.feed(text[i : i + chunk_size]))
+    segments.extend(parser.close())
+    return segments
+
+
+CASES = [
+    ("extract_emotion", legacy_extract_emotion, extract_emotion),
+    ("parse_emotions", legacy_parse_emotions, parse_emotions),
+    ("chat reply path", legacy_chat_path, tokenize_emotions),
+    # 逐次解析は一括解析 (旧実装) に対するオーバーヘッドの目安
+    ("stream (8 chars)", legacy_parse_emotions, stream_parse),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(
+        f"{'case':<18} {'sample':<10} {'legacy us':>10} {'new us':>10} {'speedup':>8}"
+    )
+    for name, legacy, current in CASES:
+        for sample_name, text in SAMPLES.items():
+            t_old = timeit.timeit(
+                lambda func=legacy, text=text: func(text), number=args.number
+            )
+            t_new = timeit.timeit(
+                lambda func=current, text=text: func(text), number=args.number
+            )
+            us_old = t_old / args.number * 1e6
+            us_new = t_new / args.number * 1e6
+            print(
+                f"{name:<18} {sample_name:<10} {us_old:>10.2f} {us_new:>10.2f} "
+                f"{us_old / us_new:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+起動時の import 時間の計測 (python -X importtime)．
+
+使い方 (リポジトリのルートで実行):
+    python benchmarks/bench_import.py [--engine voicevox|aivoice] [--budget-ms 500]
+
+新しいインタープリターで cogs.tts_engines を import し、選択したエンジンの
+プロバイダーを作成するまでを計測して、次の2点を確認する (満たさなければ終了コード 1)．
+- 選ばなかったエンジンのモジュールと、A.I.VOICE 以外での pythonnet / clr を
+  読み込んでいないこと
+- import 時間の合計が --budget-ms 以内であること
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+SNIPPET = "from cogs.tts_engines import get_tts_provider; get_tts_provider({engine!r})"
+
+# エンジンごとに読み込んではいけないモジュール
+FORBIDDEN = {
+    "voicevox": ["cogs.tts_engines.aivoice", "pythonnet", "clr"],
+    "aivoice": ["cogs.tts_engines.voicevox"],
+}
+
+
+def measure(engine: str) -> list[tuple[str, int, int, int]]:
+    """[(モジュール名, self[us], cumulative[us], 階層), ...] を import 順で返す"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET.format(engine=engine)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import failed:\n{proc.stderr}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engine", choices=list(FORBIDDEN), default="voicevox")
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = measure(args.engine)
+    # 最も外側の import の cumulative の合計が全体の時間
+    min_depth = min(depth for *_, depth in rows)
+    total_ms = sum(cum for _, _, cum, depth in rows if depth == min_depth) / 1000
+    loaded = {name for name, *_ in rows}
+
+    print(f"engine={args.engine} modules={len(rows)} total={total_ms:.1f}ms")
+    print(f"{'self ms':>8} {'cum ms':>8}  module")
+    for name, self_us, cum_us, _ in sorted(rows, key=lambda r: -r[1])[: args.top]:
+        print(f"{self_us / 1000:>8.1f} {cum_us / 1000:>8.1f}  {name}")
+
+    failures = [
+        f"{name} was imported" for name in FORBIDDEN[args.engine] if name in loaded
+    ]
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f}ms exceeds {args.budget_ms}ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+rust_core.process_audio_pipeline を Python から呼び出したときのベンチマーク
+(pytest-benchmark)．
+
+使い方 (リポジトリのルートで実行．rust_core と pytest-benchmark のインストールが必要):
+    python -m pytest benchmarks/bench_rust_core.py --benchmark-only
+
+ファイル名が test_ で始まらないため、パスを明示したときだけ収集される．
+各ケースの extra_info に FFI 境界で受け渡したバイト数 (rust_core.ffi_stats) を記録する．
+Rust 側の各段のベンチマークは rust_core/ で `cargo bench` を実行する．
+"""
+
+import functools
+import io
+import math
+import pathlib
+import struct
+import sys
+import wave
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("pytest_benchmark")
+rust_core = pytest.importorskip("rust_core")
+if not hasattr(rust_core, "process_audio_pipeline"):
+    pytest.skip(
+        "rust_core is not built (run `maturin develop --release` in rust_core/)",
+        allow_module_level=True,
+    )
+
+from cogs.dsp import render_pcm  # noqa: E402
+
+SAMPLE_RATES = [22050, 24000, 44100, 48000]
+CHANNELS = [1, 2]
+# 短い返答と長い読み上げ
+DURATIONS = {"short": 1.0, "long": 10.0}
+
+
+@functools.lru_cache(maxsize=None)
+def make_wav(sample_rate: int, channels: int, seconds: float) -> bytes:
+    """前後に100msの無音を付けた 440Hz の正弦波 (16bit)"""
+    frames = int(sample_rate * seconds)
+    pad = int(sample_rate * 0.1)
+    step = 2 * math.pi * 440 / sample_rate
+    samples = [0] * pad
+    samples += [int(8000 * math.sin(i * step)) for i in range(frames)]
+    samples += [0] * pad
+    frame_fmt = "<" + "h" * channels
+    data = b"".join(struct.pack(frame_fmt, *([s] * channels)) for s in samples)
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(data)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("duration", list(DURATIONS))
+@pytest.mark.parametrize("channels", CHANNELS)
+@pytest.mark.parametrize("sample_rate", SAMPLE_RATES)
+def test_pipeline(benchmark, sample_rate, channels, duration):
+    wav = make_wav(sample_rate, channels, DURATIONS[duration])
+
+    rust_core.reset_ffi_stats()
+    pcm = benchmark(render_pcm, wav)
+    stats = rust_core.ffi_stats()
+
+    calls = stats["calls"] or 1
+    benchmark.extra_info.update(
+        wav_bytes=len(wav),
+        pcm_bytes=len(pcm),
+        ffi_bytes_in_per_call=stats["bytes_in"] / calls,
+        ffi_bytes_copied_out_per_call=stats["bytes_copied_out"] / calls,
+    )
+
+    # Discord の PCM (48kHz / ステレオ / 16bit) になっていること
+    assert len(pcm) % 4 == 0
+    assert stats["bytes_copied_out"] == len(pcm) * stats["calls"]
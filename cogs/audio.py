@@ -5,49 +5,146 @@ import asyncio
 import os
 import logging
 import traceback
-import io
 import random
+import time
+from contextlib import nullcontext
 import settings
 from .consts import load_json, extract_emotion
 from .models import CharacterResponses
+from .audio_cache import AudioCache
+from .audio_source import ContinuousAudioSource
+from .cancellation import CancelToken, SynthesisCancelled
+from .dsp import render_pcm, rust_core
+from .metrics import metrics
+from .voice_events import VoiceEventCoalescer
+from .speech_queue import (
+    LANE_NAMES,
+    PRIORITY_AMBIENT,
+    PRIORITY_REPLY,
+    SHED_DROP_LOWEST,
+    SpeechJob,
+    SpeechQueue,
+)
+from .preset_index import PresetIndex
+from .synth_executor import SynthesisExecutor
+from .tracing import UtteranceTrace
 from .tts_engines import get_tts_provider
-
-# Rust拡張モジュールのインポート
-try:
-    import rust_core
-except ImportError:
-    print("[CRITICAL] 'rust_core' module not found.")
-    rust_core = None
+from .tts_engines.base import DISCORD_OUTPUT_FORMAT
+from .tts_engines.health import (
+    OPEN,
+    STATE_VALUES,
+    CircuitBreaker,
+    EngineUnavailable,
+    HealthMonitor,
+)
 
 logger = logging.getLogger(__name__)
 
 
-class RustAudioSource(discord.AudioSource):
-    """メモリ上のPCMデータを再生するAudioSource"""
+class GuildAudio:
+    """ギルドごとの読み上げキューと再生状態"""
 
-    def __init__(self, pcm_data: bytes):
-        self.stream = io.BytesIO(pcm_data)
+    def __init__(self, guild_id, speech_queue: SpeechQueue):
+        self.guild_id = guild_id
+        # 優先度レーン付きの読み上げキュー (アラーム > 返答 > 状態変化)
+        self.speech_queue = speech_queue
+        # 合成済みで再生待ちの音声 (1件だけ先読みする)
+        self.playback_queue = asyncio.Queue(maxsize=1)
+        # 連続再生ソースとその再生タスク
+        self.session = None
+        self.session_task = None
+        # 合成ステージと再生ステージのタスク
+        self.tasks = []
+        # これから積むジョブに持たせる取り消しトークン
+        self.cancel_token = CancelToken()
 
-    def read(self):
-        return self.stream.read(3840)
+    def cancel(self):
+        """
+        合成中・再生待ちを含む未処理の読み上げをすべて取り消す．
+        以降に積まれるジョブには新しいトークンを持たせる．
+        """
+        self.cancel_token.cancel()
+        self.cancel_token = CancelToken()
+        for queue in (self.speech_queue, self.playback_queue):
+            while not queue.empty():
+                try:
+                    queue.get_nowait()
+                    self.speech_queue.task_done()
+                    metrics.inc("speech_cancelled_total", stage="queued")
+                except asyncio.QueueEmpty:
+                    break
 
-    def is_opus(self):
-        return False
+    def close(self):
+        for task in self.tasks:
+            task.cancel()
+        self.cancel()
+        if self.session is not None:
+            self.session.cleanup()
 
 
-class AudioSystem(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.speech_queue = asyncio.Queue()
+class EngineState:
+    """エンジン1つ分のプロバイダー・合成実行器・サーキットブレーカー・ヘルスモニター"""
+
+    def __init__(self, name: str, provider):
+        # 複数のエンジンを束ねたプロバイダー (CompositeProvider) はその合計
+        names = getattr(provider, "engine_names", [name])
+        self.name = "+".join(names)
+        self.provider = provider
+        # エンジンの同時処理数に合わせた合成専用の実行器
+        # (A.I.VOICE はエディタが1つなので1、VOICEVOX は複数可)
+        workers = getattr(settings, "SYNTH_WORKERS", {})
+        self.executor = SynthesisExecutor(
+            self.name,
+            workers=sum(workers.get(engine, 1) for engine in names),
+            dsp_workers=getattr(settings, "SYNTH_DSP_WORKERS", 1),
+            dsp_processes=getattr(settings, "SYNTH_DSP_PROCESSES", 0),
+        )
+        # 複数のエンジンを束ねたプロバイダーはエンジンごとのブレーカーで切り替えるため、
+        # 外側のブレーカーはすべてのエンジンが使えないときだけ開く
+        self.routed = len(names) > 1
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_threshold=getattr(settings, "TTS_BREAKER_FAILURES", 3),
+            reset_timeout=getattr(settings, "TTS_BREAKER_RESET_SEC", 30),
+        )
+        # ヘルスチェックは合成と同じ実行器で行い、エンジンの操作が重ならないようにする
+        self.monitor = HealthMonitor(
+            self.name,
+            provider.health_check,
+            self.breaker,
+            run=lambda func: self.executor.run(func, stage="health"),
+            busy=lambda: self.executor.inflight > 0,
+            interval=getattr(settings, "TTS_HEALTH_INTERVAL_SEC", 10),
+            retry_interval=getattr(settings, "TTS_HEALTH_RETRY_SEC", 3),
+        )
+
+    def close(self):
+        self.monitor.stop()
+        self.executor.shutdown()
+        self.provider.terminate()
 
-        engine_name = getattr(settings, "TTS_ENGINE", "aivoice")
-        self.tts_provider = get_tts_provider(engine_name)
-        self.tts_provider.initialize()
 
-        start_char = getattr(settings, "STARTUP_CHARACTER", None)
-        if start_char:
-            logger.info(f"Applying startup character: {start_char}")
-            self.tts_provider.set_preset(start_char)
+class AudioSystem(commands.Cog):
+    def __init__(self, bot, tts_provider=None):
+        self.bot = bot
+        # ギルドID -> GuildAudio (最初の読み上げ時に作成)
+        self.guilds = {}
+        engine_name = getattr(settings, "TTS_ENGINE", "aivoice").lower()
+        # tts_provider を渡した場合はそれを使う (ベンチマークなど)．
+        # なければ起動処理 (main.py) が作成したエンジンを共有する
+        self.engine = EngineState(
+            engine_name,
+            tts_provider
+            or getattr(bot, "tts_provider", None)
+            or get_tts_provider(
+                engine_name, getattr(settings, "TTS_FALLBACK_ENGINE", None)
+            ),
+        )
+        self.tts_provider = self.engine.provider
+        self.synth_executor = self.engine.executor
+        # エンジンの初期化は prepare_engine で行い、完了までは合成を始めない
+        self.engine_ready = asyncio.Event()
+        self.engine_task = None
 
         # Pydanticモデルとしてロード
         # settings.RESPONSES は辞書だが、型安全なアクセスのために変換を試みる
@@ -60,13 +157,200 @@ class AudioSystem(commands.Cog):
             )
             self.responses = CharacterResponses()
 
+        # 入退室・ミュートなどの読み上げをギルドごとにまとめる
+        self.voice_events = VoiceEventCoalescer(
+            getattr(settings, "VOICE_EVENT_DEBOUNCE_SEC", 1.5),
+            self._speak_voice_events,
+        )
+
+        # /char オートコンプリート用のプリセット索引
+        self.preset_index = PresetIndex()
+
         self.word_dict = load_json("dictionary.json", {})
-        self.bg_task = self.bot.loop.create_task(self.process_queue())
+
+        self.warm_up_task = None
+
+        # 合成・DSP 済みの音声のキャッシュ (固定セリフは起動時に事前合成する)
+        self.audio_cache = AudioCache(
+            max_bytes=int(getattr(settings, "AUDIO_CACHE_MAX_MB", 64) * 1024 * 1024),
+            maxsize=getattr(settings, "AUDIO_CACHE_MAX_ENTRIES", 512),
+        )
+        self.prerender_task = None
+
+        # /stats や Prometheus 出力時に現在値を集めるゲージ
+        metrics.register_gauge("speech_queue_depth", self._queue_depth_gauge)
+        metrics.register_gauge(
+            "synthesis_inflight",
+            lambda: [
+                ({"engine": self.synth_executor.engine}, self.synth_executor.inflight)
+            ],
+        )
+        metrics.register_gauge(
+            "tts_circuit_state",
+            lambda: [
+                ({"engine": self.engine.name}, STATE_VALUES[self.engine.breaker.state])
+            ],
+        )
+
+    def _queue_depth_gauge(self):
+        return [
+            ({"guild": guild_id, "lane": lane}, depth)
+            for guild_id, state in list(self.guilds.items())
+            for lane, depth in state.speech_queue.lane_depths().items()
+        ]
+
+    async def cog_load(self):
+        # エンジンの準備は Discord への接続と並行して行う
+        self.engine_task = asyncio.create_task(self._start_engine())
+
+    async def _start_engine(self):
+        await self.prepare_engine()
+        # 以降はエンジンの死活をバックグラウンドで監視する
+        self.engine.monitor.start()
+        # 声を読み込ませ、固定セリフを合成しておく
+        self.start_warm_up()
+        self.start_prerender()
+
+    async def prepare_engine(self):
+        """
+        エンジンを初期化し、出力形式と起動時のキャラクターを設定する．
+        起動処理がエンジンの起動確認 (bot.engine_probe) を行っている場合は
+        その完了を待ち、初期化を繰り返さない．
+        """
+        started = time.perf_counter()
+        try:
+            probe = getattr(self.bot, "engine_probe", None)
+            if probe is not None:
+                await probe
+            else:
+                await asyncio.to_thread(self.tts_provider.initialize)
+
+            # Discord と同じ形式で出力できるエンジンにはその形式で出力させる
+            output_format = self.tts_provider.negotiate_output_format(
+                DISCORD_OUTPUT_FORMAT
+            )
+            if output_format:
+                logger.info(
+                    f"TTS output format: {output_format.sample_rate}Hz"
+                    f" / {output_format.channels}ch"
+                )
+
+            start_char = getattr(settings, "STARTUP_CHARACTER", None)
+            if start_char:
+                logger.info(f"Applying startup character: {start_char}")
+                if not self.tts_provider.set_preset(start_char):
+                    logger.warning(f"Startup character not found: {start_char}")
+        except Exception as e:
+            logger.error(f"TTS engine initialization failed: {e}")
+        finally:
+            # 失敗しても読み上げ自体は試みる (エンジン側で再接続する)
+            self.engine_ready.set()
+
+        logger.info(
+            f"TTS engine ready in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def start_warm_up(self):
+        """ウォームアップをバックグラウンドで開始する (実行中のものは取り消す)"""
+        if not getattr(settings, "TTS_WARMUP", True):
+            return
+        if self.warm_up_task is not None:
+            self.warm_up_task.cancel()
+        self.warm_up_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        # 合成と同じ実行器で動かし、A.I.VOICE のエディタ操作が合成と重ならないようにする
+        started = time.perf_counter()
+        try:
+            await self.synth_executor.run(self.tts_provider.warm_up, stage="warmup")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"TTS warm-up failed: {e}")
+            return
+        logger.info(
+            f"TTS warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+
+    def start_prerender(self):
+        """固定セリフの事前合成をバックグラウンドで開始する (実行中のものは取り消す)"""
+        if (
+            not getattr(settings, "AUDIO_PRERENDER", True)
+            or not self.audio_cache.maxsize
+        ):
+            return
+        if self.prerender_task is not None:
+            self.prerender_task.cancel()
+        self.prerender_task = asyncio.create_task(self._prerender())
+
+    def _canned_lines(self) -> list:
+        """
+        読み上げ用の固定セリフのうち、プレースホルダーを含まないもの
+        [(テキスト, 感情), ...] を重複なしで返す．
+        """
+        lines = {}
+        for key, value in settings.RESPONSES.items():
+            # *_text はチャットに書き込むだけで読み上げない
+            if key.endswith("_text"):
+                continue
+            for template in value if isinstance(value, list) else [value]:
+                if isinstance(template, str) and template and "{" not in template:
+                    lines[extract_emotion(template)] = None
+        return list(lines)
+
+    async def _prerender(self):
+        """
+        固定セリフを合成して音声キャッシュに入れる．
+        読み上げの邪魔をしないよう、キューが空いているときに1件ずつ合成する．
+        """
+        if self.warm_up_task is not None:
+            await asyncio.wait([self.warm_up_task])
+
+        started = time.perf_counter()
+        rendered = 0
+        for text, emotion in self._canned_lines():
+            key = self.audio_cache.key(
+                self.tts_provider, self._apply_dictionary(text), emotion
+            )
+            if key is None:
+                return
+            if key in self.audio_cache:
+                continue
+
+            await self._wait_until_idle()
+            job = SpeechJob(None, text, emotion)
+            try:
+                pcm_clips = await self._render(job, stage="prerender")
+            except Exception as e:
+                logger.warning(f"Pre-render failed ({text}): {e}")
+                continue
+            if self._cache_rendered(key, job, pcm_clips):
+                rendered += 1
+
+        logger.info(
+            f"Pre-rendered {rendered} voice lines in"
+            f" {(time.perf_counter() - started) * 1000:.0f}ms"
+            f" (audio cache: {len(self.audio_cache)} entries,"
+            f" {self.audio_cache.total_bytes / 1024 / 1024:.1f}MiB)"
+        )
+
+    async def _wait_until_idle(self, interval: float = 0.5):
+        """合成中・合成待ちの読み上げがなくなり、エンジンが正常になるまで待つ"""
+        while (
+            self.synth_executor.inflight
+            or not self.engine.breaker.available()
+            or any(state.speech_queue.qsize() for state in list(self.guilds.values()))
+        ):
+            await asyncio.sleep(interval)
 
     def cog_unload(self):
-        self.bg_task.cancel()
-        if self.tts_provider:
-            self.tts_provider.terminate()
+        for task in (self.engine_task, self.warm_up_task, self.prerender_task):
+            if task is not None:
+                task.cancel()
+        for state in self.guilds.values():
+            state.close()
+        self.guilds.clear()
+        self.engine.close()
 
     def update_responses(self, new_responses_dict: dict):
         """キャラクター変更時にレスポンス定義を更新する"""
@@ -76,33 +360,96 @@ class AudioSystem(commands.Cog):
         except Exception as e:
             logger.error(f"Failed to update responses: {e}")
 
-    async def process_queue(self):
+    def _new_speech_queue(self) -> SpeechQueue:
+        max_age_sec = getattr(settings, "SPEECH_MAX_AGE_SEC", {})
+        return SpeechQueue(
+            maxsize=getattr(settings, "SPEECH_QUEUE_MAX_PER_GUILD", 20),
+            max_age={
+                priority: max_age_sec[name]
+                for priority, name in LANE_NAMES.items()
+                if max_age_sec.get(name) is not None
+            },
+            shed_policy=getattr(settings, "SPEECH_SHED_POLICY", SHED_DROP_LOWEST),
+        )
+
+    def _guild_audio(self, guild_id) -> GuildAudio:
+        """ギルドの読み上げ状態を取得する (なければ作成してワーカーを起動)"""
+        state = self.guilds.get(guild_id)
+        if state is None:
+            state = GuildAudio(guild_id, self._new_speech_queue())
+            state.tasks = [
+                self.bot.loop.create_task(self.process_queue(state)),
+                self.bot.loop.create_task(self.process_playback(state)),
+            ]
+            self.guilds[guild_id] = state
+        return state
+
+    def _close_guild(self, guild_id):
+        """切断時にギルドの読み上げ状態を破棄する"""
+        state = self.guilds.pop(guild_id, None)
+        if state is not None:
+            state.close()
+
+    async def process_queue(self, state: GuildAudio):
+        """
+        合成ステージ．
+        前の音声を再生している間に次の音声を合成し、再生キューへ渡す．
+        """
         await self.bot.wait_until_ready()
+        await self.engine_ready.wait()
         while not self.bot.is_closed():
             try:
                 # キューからタスク取得
-                task = await self.speech_queue.get()
+                job = await state.speech_queue.get()
+                trace = job.trace
+                if trace:
+                    trace.mark("queue_wait")
 
+                pcm_clips = []
+                vc_client = job.vc_client
                 try:
-                    vc_client, text, emotion = task
-
-                    if vc_client and vc_client.is_connected():
-                        # 重い処理を別スレッドへ逃がす (非同期化)
-                        audio_source = await self.bot.loop.run_in_executor(
-                            None, self._generate_audio_sync, text, emotion
-                        )
+                    # 待ち時間が長すぎる状態変化などは読み上げない
+                    if (
+                        vc_client
+                        and vc_client.is_connected()
+                        and not state.speech_queue.is_stale(job)
+                    ):
+                        # 固定セリフなど合成済みの音声があればそのまま再生する
+                        cache_key = None
+                        if not job.segments:
+                            cache_key = self.audio_cache.key(
+                                self.tts_provider,
+                                self._apply_dictionary(job.text),
+                                job.emotion,
+                            )
+                            cached = self.audio_cache.get(cache_key)
+                            if cached is not None:
+                                pcm_clips = [cached]
 
-                        if audio_source:
-                            await self.play_audio_source(vc_client, audio_source)
+                        if not pcm_clips:
+                            pcm_clips = await self._render(job, trace)
+                            self._cache_rendered(cache_key, job, pcm_clips)
 
+                except SynthesisCancelled:
+                    pass
+                except EngineUnavailable as e:
+                    metrics.inc("speech_failed_total", reason="engine_unavailable")
+                    logger.warning(f"TTS engine unavailable, skipped speech: {e}")
                 except Exception as e:
                     logger.error(f"Task processing error: {e}")
                     logger.error(traceback.format_exc())
-                finally:
-                    # 成功・失敗に関わらず必ず完了通知を送る
-                    self.speech_queue.task_done()
 
-                await asyncio.sleep(0.1)
+                if pcm_clips and job.cancel_token.cancelled:
+                    # 合成中に /stop された音声は再生しない
+                    metrics.inc("speech_cancelled_total", stage="playback")
+                    pcm_clips = []
+
+                if pcm_clips:
+                    # 完了通知は再生ステージが再生終了後に送る
+                    await state.playback_queue.put((job, pcm_clips))
+                else:
+                    # 再生しない場合はここで完了通知を送る
+                    state.speech_queue.task_done()
 
             except asyncio.CancelledError:
                 break
@@ -110,17 +457,193 @@ class AudioSystem(commands.Cog):
                 # キュー取得自体（get）のエラーなど
                 logger.error(f"Queue get error: {e}")
 
-    def _generate_audio_sync(self, text: str, emotion: str):
+    def _cache_rendered(self, key, job: SpeechJob, pcm_clips: list) -> bool:
+        """
+        合成した音声をキャッシュに入れる．キーと違う声で合成された場合
+        (予備のエンジンで合成した場合など) は入れない．
+        """
+        if key is None or not pcm_clips:
+            return False
+        if job.voice is not None and job.voice != key[1]:
+            return False
+        self.audio_cache.put(key, pcm_clips[0])
+        return True
+
+    async def _render(self, job: SpeechJob, trace=None, stage: str = "engine") -> list:
+        """
+        ジョブを合成し、DSP 済みの PCM のリストを返す．
+        合成結果をエンジンのサーキットブレーカーに記録し、
+        使った声を job.voice に入れる．
+        """
+        if not rust_core:
+            return []
+        engine = self.engine
+        # エンジンが異常なら合成を待たずに諦める
+        if not engine.routed and not engine.breaker.allow():
+            raise EngineUnavailable(f"retry after {engine.breaker.retry_after:.0f}s")
+        # 重い処理を合成専用のスレッドへ逃がす (非同期化)
+        try:
+            if job.segments:
+                wav_list = await engine.executor.run(
+                    self._synthesize_batch_sync,
+                    job.segments,
+                    job.cancel_token,
+                    trace,
+                    stage=stage,
+                )
+            else:
+                wav_bytes, job.voice = await engine.executor.run(
+                    self._synthesize_sync,
+                    job.text,
+                    job.emotion,
+                    job.cancel_token,
+                    trace,
+                    stage=stage,
+                )
+                wav_list = [wav_bytes]
+        except EngineUnavailable:
+            # 束ねたエンジンがすべて使えない
+            engine.breaker.trip()
+            raise
+        except BaseException:
+            # 取り消しなどで結果が出なかった試行は数えない
+            engine.breaker.release()
+            raise
+        wav_list = [wav for wav in wav_list if wav]
+        # 例外は合成スレッド内でログに残して空の結果になるため、空なら失敗とみなす
+        if wav_list:
+            engine.breaker.record_success()
+        elif not engine.routed:
+            engine.breaker.record_failure()
+        if wav_list and job.cancel_token.cancelled:
+            metrics.inc("speech_cancelled_total", stage="dsp")
+            return []
+
+        # Rustパイプライン処理 (オンメモリ)
+        pcm_clips = []
+        with trace.span("dsp") if trace else nullcontext():
+            for wav_bytes in wav_list:
+                pcm = await engine.executor.run_dsp(render_pcm, wav_bytes)
+                if pcm:
+                    pcm_clips.append(pcm)
+        return pcm_clips
+
+    async def process_playback(self, state: GuildAudio):
+        """
+        再生ステージ．合成済みの音声をギルドの連続再生ソースへ流し込む．
+        再生中の1件に加えて1件まで先に渡しておき、それ以上は前の音声の終了を待つ．
+        まとめて合成したジョブはセグメントごとのクリップとして順に渡す．
+        """
+        previous = None
+        while True:
+            try:
+                job, pcm_clips = await state.playback_queue.get()
+                last = len(pcm_clips) - 1
+                for i, pcm in enumerate(pcm_clips):
+                    if job.cancel_token.cancelled:
+                        metrics.inc("speech_cancelled_total", stage="playback")
+                        state.speech_queue.task_done()
+                        break
+
+                    clip = self.play_clip(
+                        state,
+                        job.vc_client,
+                        pcm,
+                        job.trace,
+                        first=i == 0,
+                        last=i == last,
+                    )
+                    if i == last:
+                        # 完了通知は最後のクリップの最後のフレームを送り出した時点で行う
+                        clip.add_done_callback(lambda _: state.speech_queue.task_done())
+
+                    if previous is not None:
+                        await previous
+                    previous = clip
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Playback stage error: {e}")
+
+    def play_clip(
+        self,
+        state: GuildAudio,
+        vc_client,
+        pcm: bytes,
+        trace=None,
+        first: bool = True,
+        last: bool = True,
+    ) -> asyncio.Future:
         """
-        【別スレッド実行用】
-        TTS生成 -> メモリ読込 -> Rustパイプライン加工 -> AudioSource作成
+        クリップをギルドの再生セッションに追加し、再生終了で完了する Future を返す．
+        再生中のセッションがなければ新しく開始する．
+        trace の最初のフレームは first のクリップで、終了は last のクリップで記録する．
+        """
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def _resolve():
+            if not finished.done():
+                finished.set_result(None)
+
+        def _on_done():
+            if trace and last:
+                trace.finish()
+            # 再生スレッドから呼ばれるため、イベントループ側で完了させる
+            try:
+                loop.call_soon_threadsafe(_resolve)
+            except RuntimeError:
+                pass  # ループ終了後
+
+        if not vc_client.is_connected():
+            _resolve()
+            return finished
+
+        on_start = trace.first_frame if trace and first else None
+        session = state.session
+        if session is None or not session.push(pcm, _on_done, on_start):
+            session = ContinuousAudioSource(
+                gap_ms=getattr(settings, "AUDIO_CLIP_GAP_MS", 200),
+                crossfade_ms=getattr(settings, "AUDIO_CROSSFADE_MS", 0),
+                linger_ms=getattr(settings, "AUDIO_SESSION_LINGER_MS", 500),
+            )
+            session.push(pcm, _on_done, on_start)
+            state.session = session
+            state.session_task = loop.create_task(
+                self._run_session(state, vc_client, session, state.session_task)
+            )
+
+        return finished
+
+    async def _run_session(self, state: GuildAudio, vc_client, session, previous_task):
+        """連続再生セッションを再生し、終了後に後片付けする"""
+        try:
+            # 直前のセッションの after 処理が終わるまで待つ
+            if previous_task is not None:
+                await asyncio.wait([previous_task])
+            await self.play_audio_source(vc_client, session)
+        finally:
+            # 再生できなかった場合も含め、残ったクリップを完了扱いにする
+            session.cleanup()
+            if state.session is session:
+                state.session = None
+
+    def _synthesize_sync(self, text: str, emotion: str, cancel_token=None, trace=None):
+        """
+        【合成スレッド実行用】
+        辞書置換 -> TTS生成 -> メモリ読込 -> (WAVデータ, 使った声)
+        cancel_token が取り消されていればエンジン呼び出しの手前で
+        SynthesisCancelled を送出する．
+        trace (UtteranceTrace) があれば各区間の時間を記録する．
         """
         if not rust_core:
-            return None
+            return None, None
+        cancel_token = cancel_token or CancelToken()
+        span = trace.span if trace else lambda _stage: nullcontext()
 
         # 辞書置換
-        for word, reading in self.word_dict.items():
-            text = text.replace(word, reading)
+        with span("dictionary"):
+            text = self._apply_dictionary(text)
 
         # 一時ファイルパス (A.I.VOICE用。VOICEVOXなら不要だが共通化のため使用)
         # ※ A.I.VOICEは仕様上、ファイル出力が必須。
@@ -129,62 +652,190 @@ class AudioSystem(commands.Cog):
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tf:
             temp_path = tf.name
 
-        wav_bytes = None
-
         try:
             # 1. TTSエンジンでWave生成 (同期ブロック)
-            self.tts_provider.generate_audio(text, emotion, temp_path)
+            # 実行待ちの間に取り消された場合はエンジンを使わない
+            cancel_token.raise_if_cancelled()
+            with span("engine"):
+                voice = self.tts_provider.generate_audio(
+                    text, emotion, temp_path, cancel_token=cancel_token
+                )
 
             if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
                 # 2. ファイルを即座にメモリに読み込んで削除
-                with open(temp_path, "rb") as f:
-                    wav_bytes = f.read()
-
-                # A.I.VOICEが出力したファイルはもう不要
-                os.remove(temp_path)
-
-                # 3. Rustパイプライン処理 (オンメモリ)
-                # Trim(100) -> Gain(3.0dB) -> Reverb(50ms, 0.3, 0.15)
-                # パラメータは必要に応じて設定ファイルから読み込む形にしても良い
-                pcm_data = rust_core.process_audio_pipeline(
-                    wav_bytes,
-                    3.0,  # Gain dB
-                    100,  # Silence Threshold
-                    True,  # Reverb Enabled
-                    50,  # Delay ms
-                    0.3,  # Decay
-                    0.15,  # Mix
-                )
+                with span("file_io"):
+                    with open(temp_path, "rb") as f:
+                        wav_bytes = f.read()
 
-                return RustAudioSource(pcm_data)
+                    # A.I.VOICEが出力したファイルはもう不要
+                    os.remove(temp_path)
+                return wav_bytes, voice
             else:
                 logger.warning("TTS generation failed or empty file.")
-                return None
+                return None, None
+
+        except SynthesisCancelled:
+            metrics.inc("speech_cancelled_total", stage="engine")
+            self._remove_temp(temp_path)
+            raise
+
+        except EngineUnavailable:
+            self._remove_temp(temp_path)
+            raise
 
         except Exception as e:
             logger.error(f"Audio generation failed: {e}")
             logger.error(traceback.format_exc())
             # ゴミ掃除
-            if os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except Exception:
-                    pass
-            return None
+            self._remove_temp(temp_path)
+            return None, None
+
+    def _synthesize_batch_sync(self, segments: list, cancel_token=None, trace=None):
+        """
+        【合成スレッド実行用】
+        複数のセグメントを辞書置換し、エンジンでまとめて合成して
+        WAVデータのリストを返す．
+        """
+        if not rust_core:
+            return []
+        cancel_token = cancel_token or CancelToken()
+        span = trace.span if trace else lambda _stage: nullcontext()
+
+        with span("dictionary"):
+            segments = [
+                (self._apply_dictionary(text), emotion) for text, emotion in segments
+            ]
+
+        try:
+            cancel_token.raise_if_cancelled()
+            with span("engine"):
+                return self.tts_provider.synthesize_batch(
+                    segments, cancel_token=cancel_token
+                )
+
+        except SynthesisCancelled:
+            metrics.inc("speech_cancelled_total", stage="engine")
+            raise
+
+        except EngineUnavailable:
+            raise
+
+        except Exception as e:
+            logger.error(f"Batch audio generation failed: {e}")
+            logger.error(traceback.format_exc())
+            return []
+
+    def _apply_dictionary(self, text: str) -> str:
+        for word, reading in self.word_dict.items():
+            text = text.replace(word, reading)
+        return text
+
+    @staticmethod
+    def _remove_temp(path: str):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
 
     async def play_audio_source(self, vc_client, audio_source):
+        """
+        音声を再生し、終了を待つ．
+        is_playing() をポーリングせず、after コールバックを Future に橋渡しする．
+        """
         if not vc_client.is_connected():
             return
+
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def _resolve(error):
+            if not finished.done():
+                finished.set_result(error)
+
+        def _after(error):
+            # 再生スレッドから呼ばれるため、イベントループ側で完了させる
+            try:
+                loop.call_soon_threadsafe(_resolve, error)
+            except RuntimeError:
+                pass  # ループ終了後
+
         try:
-            vc_client.play(audio_source)
-            while vc_client.is_playing():
-                await asyncio.sleep(0.1)
+            vc_client.play(audio_source, after=_after)
         except Exception as e:
             logger.error(f"Playback error: {e}")
+            return
+
+        error = await finished
+        if error:
+            logger.error(f"Playback error: {error}")
+
+    def enqueue_speech(
+        self,
+        vc_client,
+        text,
+        emotion="JOY",
+        priority=PRIORITY_REPLY,
+        merge_key=None,
+        segments=None,
+    ):
+        """
+        読み上げをギルドのキューに追加する．受け付けた場合は True を返す．
+        merge_key が同じ未処理の発話は、新しいもので置き換えられる．
+        segments を渡すと1件のジョブとしてまとめて合成する．
+        キューが上限に達している場合は SPEECH_SHED_POLICY に従って破棄する．
+        """
+        state = self._guild_audio(vc_client.guild.id)
+        job = SpeechJob(
+            vc_client,
+            text,
+            emotion,
+            priority,
+            merge_key,
+            cancel_token=state.cancel_token,
+            trace=UtteranceTrace(self.synth_executor.engine, state.guild_id, text),
+            segments=segments,
+        )
+        if not state.speech_queue.offer(job):
+            logger.warning(
+                f"Audio Rejected (queue full): {text} [{LANE_NAMES[priority]}]"
+            )
+            return False
+        logger.info(f"Audio Enqueued: {text} ({emotion}) [{LANE_NAMES[priority]}]")
+        return True
 
-    def enqueue_speech(self, vc_client, text, emotion="JOY"):
-        logger.info(f"Audio Enqueued: {text} ({emotion})")
-        self.speech_queue.put_nowait((vc_client, text, emotion))
+    def enqueue_segments(self, vc_client, segments, priority=PRIORITY_REPLY):
+        """
+        感情タグで分割したセグメント [(テキスト, 感情), ...] を
+        読み上げキューに追加する．
+        まとめて合成できるエンジンでは、最初のセグメントだけ単独で先に合成し
+        (最初の音声が出るまでの時間を延ばさないため)、残りを
+        SYNTH_BATCH_MAX_SEGMENTS 件ずつ1件のジョブにまとめる．
+        すべて受け付けた場合は True を返す．
+        """
+        batch_size = getattr(settings, "SYNTH_BATCH_MAX_SEGMENTS", 8)
+        if self.tts_provider.supports_batch and batch_size > 1:
+            rest = segments[1:]
+            groups = [segments[:1]] + [
+                rest[i : i + batch_size] for i in range(0, len(rest), batch_size)
+            ]
+        else:
+            groups = [[segment] for segment in segments]
+
+        accepted = True
+        for group in groups:
+            if not group:
+                continue
+            text = " ".join(text for text, _ in group)
+            emotion = group[0][1]
+            accepted &= self.enqueue_speech(
+                vc_client,
+                text,
+                emotion,
+                priority,
+                segments=group if len(group) > 1 else None,
+            )
+        return accepted
 
     def _get_response(self, key, **kwargs):
         """
@@ -207,6 +858,27 @@ class AudioSystem(commands.Cog):
             text = template
         return extract_emotion(text)
 
+    def _speak_voice_events(self, guild_id, keys):
+        """VoiceEventCoalescer がまとめた状態変化を読み上げる"""
+        guild = self.bot.get_guild(guild_id)
+        vc = guild.voice_client if guild else None
+        if not vc or not vc.is_connected():
+            return
+
+        for key in keys:
+            text, emo = self._get_response(key)
+            if not text and key == "join_greet_normal":
+                text = "こんにちは"
+            if text:
+                # 同じ種類の読み上げがまだ残っていれば最新の1件にまとめる
+                self.enqueue_speech(
+                    vc,
+                    text,
+                    emo,
+                    priority=PRIORITY_AMBIENT,
+                    merge_key=(guild_id, key),
+                )
+
     # --- Commands ---
 
     @app_commands.command(name="join", description="ボイスチャンネルに接続します")
@@ -242,13 +914,10 @@ class AudioSystem(commands.Cog):
         if vc and vc.is_playing():
             vc.stop()
 
-        # キューを空にする
-        while not self.speech_queue.empty():
-            try:
-                self.speech_queue.get_nowait()
-                self.speech_queue.task_done()
-            except asyncio.QueueEmpty:
-                break
+        # 合成中・再生待ちを含めて取り消し、キューを空にする
+        state = self.guilds.get(interaction.guild.id)
+        if state is not None:
+            state.cancel()
 
         await interaction.response.send_message("Stopped.")
 
@@ -268,9 +937,19 @@ class AudioSystem(commands.Cog):
                 self.enqueue_speech(vc, text, emo)
 
             # 2. 音声再生が完了するまで待機（ここが数秒以上かかる）
-            await self.speech_queue.join()
+            state = self.guilds.get(interaction.guild.id)
+            if state is not None:
+                try:
+                    await asyncio.wait_for(
+                        state.speech_queue.join(),
+                        timeout=getattr(settings, "BYE_TIMEOUT_SEC", 15),
+                    )
+                except TimeoutError:
+                    # 読み上げが詰まっていても切断は待たせない
+                    logger.warning("Speech did not finish before /bye timeout.")
 
             # 3. 再生完了後に切断
+            self._close_guild(interaction.guild.id)
             await vc.disconnect()
 
             # (オプション) 完了メッセージを送る場合
@@ -281,18 +960,21 @@ class AudioSystem(commands.Cog):
     async def preset_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice[str]]:
-        presets = self.tts_provider.get_presets()
+        # 一覧が変わったときだけ索引を作り直す
+        rebuilt = self.preset_index.ensure(self.tts_provider.get_presets())
+        metrics.cache_lookup("preset_index", not rebuilt)
         return [
             app_commands.Choice(name=p, value=p)
-            for p in presets
-            if current.lower() in p.lower()
-        ][:25]
+            for p in self.preset_index.search(current)
+        ]
 
     @app_commands.command(name="char", description="TTSキャラクター変更")
     @app_commands.autocomplete(style=preset_autocomplete)
     async def char(self, interaction: discord.Interaction, style: str):
         if self.tts_provider.set_preset(style):
             await interaction.response.send_message(f"Changed to: **{style}**")
+            self.start_warm_up()
+            self.start_prerender()
             if interaction.guild.voice_client:
                 text, emo = self._get_response("char_change_voice")
                 self.enqueue_speech(
@@ -311,6 +993,39 @@ class AudioSystem(commands.Cog):
             disp += f"\n...and {len(presets) - 20} more."
         await interaction.response.send_message(f"**Presets:**\n{disp}")
 
+    @app_commands.command(name="queue", description="読み上げキューの状況")
+    async def queue_status(self, interaction: discord.Interaction):
+        state = self.guilds.get(interaction.guild.id)
+        # まだ読み上げていないギルドは空のキューとして表示する
+        queue = state.speech_queue if state else self._new_speech_queue()
+        depths = queue.lane_depths()
+        lines = [f"**Speech Queue** ({queue.qsize()}/{queue.maxsize or '∞'})"]
+        for priority, name in LANE_NAMES.items():
+            st = queue.stats[priority]
+            lines.append(
+                f"`{name:<7}` 待機 {depths[name]}件 / 平均 {st.avg_wait:.2f}s"
+                f" / p95 {st.p95_wait:.2f}s / 最大 {st.max_wait:.2f}s"
+                f" / 統合 {st.merged} / 期限切れ {st.dropped} / 溢れ {st.shed}"
+            )
+        lines.append(
+            "`voice  ` 状態変化 {:.0f}件 → 読み上げ {:.0f}件 (集約 {:.0f}件)".format(
+                metrics.counter("voice_events_received_total"),
+                metrics.counter("voice_events_emitted_total"),
+                metrics.counter("voice_events_coalesced_total"),
+            )
+        )
+        executor = self.synth_executor
+        lines.append(
+            f"`synth  ` 合成中 {executor.inflight}/{executor.workers}"
+            f" / DSP {executor.dsp_inflight} ({executor.dsp_mode})"
+        )
+        breaker = self.engine.breaker
+        line = f"`engine ` {self.engine.name}: {breaker.state}"
+        if breaker.state == OPEN:
+            line += f" (再試行まで {breaker.retry_after:.0f}s)"
+        lines.append(line)
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         if member.bot:
@@ -326,10 +1041,13 @@ class AudioSystem(commands.Cog):
                     return
 
             if vc.channel == after.channel:
-                text, emo = self._get_response("join_greet_normal")
-                self.enqueue_speech(vc, text or "こんにちは", emo)
+                self.voice_events.record_join(member.guild.id, member.id)
 
         vc = member.guild.voice_client
+        # 挨拶前に退室した場合は挨拶を取り消す
+        if vc and before.channel == vc.channel and after.channel != vc.channel:
+            self.voice_events.record_leave(member.guild.id, member.id)
+
         if vc and after.channel == vc.channel:
             # 状態変化イベント
             events = [
@@ -340,15 +1058,17 @@ class AudioSystem(commands.Cog):
             ]
             for b_state, a_state, k_start, k_end in events:
                 if b_state != a_state:
-                    key = k_start if a_state else k_end
-                    text, emo = self._get_response(key)
-                    if text:
-                        self.enqueue_speech(vc, text, emo)
+                    # すぐに元へ戻った切り替えは読み上げないよう一旦保留する
+                    self.voice_events.record_toggle(
+                        member.guild.id, member.id, k_start, k_end, b_state, a_state
+                    )
 
         # Auto Disconnect
         if vc and before.channel == vc.channel:
             human_count = sum(1 for m in vc.channel.members if not m.bot)
             if human_count == 0:
+                self.voice_events.cancel(member.guild.id)
+                self._close_guild(member.guild.id)
                 await vc.disconnect()
 
 
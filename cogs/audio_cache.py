@@ -0,0 +1,25 @@
+from .lru import LRUCache
+
+
+class AudioCache(LRUCache):
+    """
+    合成・DSP 済みの再生用 PCM のキャッシュ．
+    キーは (エンジン, 声, 辞書置換後のテキスト, 感情) で、容量はバイト数で制限する．
+    ヒット率は cache_requests_total{cache="audio"} に記録する．
+    """
+
+    def __init__(self, max_bytes: int, maxsize: int = 512):
+        super().__init__(maxsize if max_bytes else 0, name="audio", max_bytes=max_bytes)
+
+    @staticmethod
+    def key(provider, text: str, emotion: str):
+        """キャッシュのキーを返す．声を特定できないエンジンでは None"""
+        voice = provider.current_voice()
+        if voice is None:
+            return None
+        return (type(provider).__name__, voice, text, emotion)
+
+    def get(self, key, default=None):
+        if key is None:
+            return default
+        return super().get(key, default)
@@ -0,0 +1,186 @@
+import sys
+import threading
+from array import array
+from collections import deque
+
+import discord
+
+# Discord の PCM 形式 (48kHz / ステレオ / 16bit) における 20ms 1フレームのバイト数
+FRAME_SIZE = 3840
+BYTES_PER_MS = 48000 * 2 * 2 // 1000
+SILENCE_FRAME = bytes(FRAME_SIZE)
+
+
+def _ms_to_bytes(ms: int) -> int:
+    # ステレオ16bitのサンプル境界 (4バイト) に揃える
+    return max(0, int(ms)) * BYTES_PER_MS // 4 * 4
+
+
+def _crossfade(tail: bytes, head: bytes) -> bytes:
+    """前の音声の末尾と次の音声の先頭を線形にクロスフェードする"""
+    a = array("h", tail)
+    b = array("h", head)
+    if sys.byteorder == "big":
+        a.byteswap()
+        b.byteswap()
+
+    frames = len(a) // 2
+    out = array("h", a)
+    for i in range(len(a)):
+        t = (i // 2) / frames
+        out[i] = int(a[i] * (1.0 - t) + b[i] * t)
+
+    if sys.byteorder == "big":
+        out.byteswap()
+    return out.tobytes()
+
+
+class ContinuousAudioSource(discord.AudioSource):
+    """
+    ギルドごとの連続再生ソース．
+    準備済みのクリップを順に取り出してフレーム単位で切れ目なく送り出す．
+    クリップ間の無音・クロスフェード・フレーム境界の調整はここで行う
+    (rust_core 側では無音パディングを付けない)．
+
+    キューが空になってもしばらくは無音フレームを返して待機し、
+    その間に次のクリップが届けば同じ再生セッションのまま続ける．
+    """
+
+    def __init__(self, gap_ms: int = 0, crossfade_ms: int = 0, linger_ms: int = 0):
+        self._lock = threading.Lock()
+        self._clips = deque()  # (pcm, on_done, on_start)
+        self._buffer = bytearray()
+        self._pos = 0
+        # ストリーム全体で追加済み / 送出済みのバイト数
+        self._appended = 0
+        self._emitted = 0
+        # (クリップ終端のストリーム位置, on_done)
+        self._markers = deque()
+        # (クリップ先頭のストリーム位置, on_start)
+        self._start_markers = deque()
+
+        self._gap_bytes = _ms_to_bytes(gap_ms)
+        self._xfade_bytes = _ms_to_bytes(crossfade_ms)
+        self._linger_frames = -(-max(0, int(linger_ms)) // 20)
+        self._idle_frames = 0
+        self._started = False
+        self._finished = False
+
+    def push(self, pcm: bytes, on_done=None, on_start=None) -> bool:
+        """
+        クリップを追加する．セッションが既に終了していれば False を返す．
+        on_start / on_done はクリップの最初 / 最後のフレームを送り出したとき
+        (再生スレッド上) に呼ばれる．
+        """
+        with self._lock:
+            if self._finished:
+                return False
+            self._clips.append((pcm, on_done, on_start))
+            return True
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def _load_next_clip(self):
+        pcm, on_done, on_start = self._clips.popleft()
+        pcm = memoryview(pcm)[: len(pcm) - len(pcm) % 4]
+
+        # 送出済みの領域を詰める (クリップ1件につき1回)
+        if self._pos:
+            del self._buffer[: self._pos]
+            self._pos = 0
+
+        rest = len(self._buffer)
+        overlap = (
+            min(rest, self._xfade_bytes, len(pcm)) // 4 * 4 if self._started else 0
+        )
+
+        if overlap:
+            mixed = _crossfade(
+                bytes(self._buffer[rest - overlap :]), bytes(pcm[:overlap])
+            )
+            self._buffer[rest - overlap :] = mixed
+            start = self._appended - overlap
+            self._buffer.extend(pcm[overlap:])
+            self._appended += len(pcm) - overlap
+        else:
+            if self._started:
+                # 待機中に送った無音の分だけ間隔を短くする
+                gap = self._gap_bytes - self._idle_frames * FRAME_SIZE
+                if gap > 0:
+                    self._buffer.extend(bytes(gap))
+                    self._appended += gap
+            start = self._appended
+            self._buffer.extend(pcm)
+            self._appended += len(pcm)
+
+        self._started = True
+        self._markers.append((self._appended, on_done))
+        if on_start:
+            self._start_markers.append((start, on_start))
+
+    def _pop_done(self) -> list:
+        done = []
+        while self._start_markers and self._start_markers[0][0] < self._emitted:
+            done.append(self._start_markers.popleft()[1])
+        while self._markers and self._markers[0][0] <= self._emitted:
+            _, on_done = self._markers.popleft()
+            if on_done:
+                done.append(on_done)
+        return done
+
+    def read(self) -> bytes:
+        with self._lock:
+            if self._finished:
+                return b""
+
+            # クロスフェードに必要な分だけ手前で次のクリップを取り込む
+            while self._clips and (
+                len(self._buffer) - self._pos < FRAME_SIZE + self._xfade_bytes
+            ):
+                self._load_next_clip()
+
+            available = len(self._buffer) - self._pos
+            if available == 0:
+                done = self._pop_done()
+                if self._idle_frames >= self._linger_frames:
+                    self._finished = True
+                    frame = b""
+                else:
+                    self._idle_frames += 1
+                    frame = SILENCE_FRAME
+            else:
+                # 最後の端数はフレーム長まで無音で埋める
+                if available < FRAME_SIZE:
+                    pad = FRAME_SIZE - available
+                    self._buffer.extend(bytes(pad))
+                    self._appended += pad
+
+                frame = bytes(self._buffer[self._pos : self._pos + FRAME_SIZE])
+                self._pos += FRAME_SIZE
+                self._emitted += FRAME_SIZE
+                self._idle_frames = 0
+                done = self._pop_done()
+
+        for on_done in done:
+            on_done()
+        return frame
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        """再生停止・切断時に呼ばれる．未再生のクリップも完了扱いにする"""
+        with self._lock:
+            self._finished = True
+            callbacks = [cb for _, cb in self._markers if cb]
+            callbacks += [cb for _, cb, _ in self._clips if cb]
+            self._markers.clear()
+            self._start_markers.clear()
+            self._clips.clear()
+            self._buffer = bytearray()
+            self._pos = 0
+
+        for on_done in callbacks:
+            on_done()
@@ -0,0 +1,62 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SynthesisCancelled(Exception):
+    """取り消された読み上げの処理を途中で打ち切るときに送出する"""
+
+
+class CancelToken:
+    """
+    読み上げジョブの取り消しを伝えるトークン．
+    合成スレッドから参照されるためスレッドセーフにしている．
+    /stop や切断でギルドのトークンを取り消すと、そのトークンを持つジョブは
+    エンジン呼び出し・DSP・再生の各段階の手前で打ち切られる．
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {e}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise SynthesisCancelled()
+
+    def add_callback(self, callback):
+        """
+        取り消し時に呼ぶ処理を登録する (HTTP レスポンスの受信の打ち切りなど)．
+        既に取り消し済みならその場で呼ぶ．登録解除用の関数を返す．
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def _remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return _remove
+
+        callback()
+        return lambda: None
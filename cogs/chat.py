@@ -6,9 +6,11 @@ import logging
 from openai import AsyncOpenAI, APIConnectionError
 import traceback
 import random
+import time
 from collections import deque
 import settings
-from .consts import extract_emotion, parse_emotions
+from .consts import extract_emotion, tokenize_emotions
+from .metrics import metrics
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
@@ -88,10 +90,18 @@ class ChatSystem(commands.Cog):
                     messages = [{"role": "system", "content": settings.SYSTEM_PROMPT}]
                     messages.extend(history)
 
-                    completion = await self.llm_client.chat.completions.create(
-                        model="local-model",
-                        messages=messages,
-                        temperature=0.7,
+                    started = time.perf_counter()
+                    try:
+                        completion = await self.llm_client.chat.completions.create(
+                            model="local-model",
+                            messages=messages,
+                            temperature=0.7,
+                        )
+                    except Exception:
+                        metrics.inc("llm_errors_total")
+                        raise
+                    metrics.observe(
+                        "llm_request_seconds", time.perf_counter() - started
                     )
 
                     response_text = completion.choices[0].message.content
@@ -99,8 +109,9 @@ class ChatSystem(commands.Cog):
                     # アシスタントの応答を履歴に追加
                     history.append({"role": "assistant", "content": response_text})
 
-                    clean_text, _ = extract_emotion(response_text)
-                    await message.reply(clean_text)
+                    # タグ除去と読み上げ用の分割を1回の走査で行う
+                    parsed = tokenize_emotions(response_text)
+                    await message.reply(parsed.clean_text)
 
                     audio_cog = self.bot.get_cog("AudioSystem")
                     if (
@@ -108,11 +119,9 @@ class ChatSystem(commands.Cog):
                         and message.guild.voice_client
                         and message.guild.voice_client.is_connected()
                     ):
-                        segments = parse_emotions(response_text)
-                        for text_part, emotion in segments:
-                            audio_cog.enqueue_speech(
-                                message.guild.voice_client, text_part, emotion
-                            )
+                        audio_cog.enqueue_segments(
+                            message.guild.voice_client, parsed.segments
+                        )
 
                 except APIConnectionError:
                     logger.error("Failed to connect to LLM server.")
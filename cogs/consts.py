@@ -2,12 +2,15 @@ import json
 import os
 import re
 import logging
-from typing import Type, TypeVar
+from typing import NamedTuple, Type, TypeVar
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
 TAG_PATTERN = r"[\[【(（]\s*[A-Z]+\s*[\]】)）]"
+# 感情名をキャプチャするコンパイル済みパターン (呼び出しごとの再解析を避ける)
+_TAG_RE = re.compile(r"[\[【(（]\s*([A-Z]+)\s*[\]】)）]")
+_TAG_OPENERS = "[【(（"
 T = TypeVar("T", bound=BaseModel)
 
 
@@ -58,22 +61,56 @@ def extract_emotion(text):
     if not isinstance(text, str):
         return str(text), "JOY"
 
-    # タグ全体を検索
-    match = re.search(TAG_PATTERN, text)
-    emotion = "JOY"  # デフォルト
-    clean_text = text
+    # 最初のタグから感情名を取り出し、残りの部分だけを置換対象にする (1パス)
+    match = _TAG_RE.search(text)
+    if not match:
+        return text, "JOY"
 
-    if match:
-        # タグが見つかった場合、その中からアルファベット部分だけを再抽出
-        tag_str = match.group()  # 例: "[SAD]"
-        emo_match = re.search(r"[A-Z]+", tag_str)
-        if emo_match:
-            emotion = emo_match.group()  # "SAD"
+    clean_text = text[: match.start()] + _TAG_RE.sub("", text[match.end() :])
+    return clean_text.strip(), match.group(1)
 
-        # タグ部分を空文字に置換して削除
-        clean_text = re.sub(TAG_PATTERN, "", text).strip()
 
-    return clean_text, emotion
+class EmotionTokens(NamedTuple):
+    """tokenize_emotions の解析結果"""
+
+    clean_text: str  # タグをすべて除去したテキスト
+    emotion: str  # 最初に現れたタグの感情 (extract_emotion と同じ)
+    segments: list  # [(テキスト, 感情), ...] (parse_emotions と同じ)
+
+
+def tokenize_emotions(text):
+    """
+    感情タグを1回の走査で解析し、タグ除去済みテキスト・代表感情・
+    読み上げ用セグメントをまとめて返す．
+    """
+    segments = []
+    clean_parts = []
+    first_emotion = None
+    pos = 0
+
+    for match in _TAG_RE.finditer(text):
+        chunk = text[pos : match.start()]
+        clean_parts.append(chunk)
+        emotion = match.group(1)
+        if first_emotion is None:
+            first_emotion = emotion
+        # タグ直前のテキストを、このタグの感情とセットにする
+        chunk = chunk.strip()
+        if chunk:
+            segments.append((chunk, emotion))
+        pos = match.end()
+
+    tail = text[pos:]
+    clean_parts.append(tail)
+    tail = tail.strip()
+    if tail:
+        # 直前の感情があればそれを引き継ぐ、なければNORMAL
+        last_emotion = segments[-1][1] if segments else "NORMAL"
+        segments.append((tail, last_emotion))
+
+    if first_emotion is None:
+        return EmotionTokens(text, "JOY", segments)
+    return EmotionTokens("".join(clean_parts).strip(), first_emotion, segments)
 
 
 def parse_emotions(text):
@@ -81,32 +118,51 @@ def parse_emotions(text):
     文章を感情タグでのみ分割してリスト化する．
     句読点による強制分割は行わない．
     """
-    # 1. タグで分割する
-    # TAG_PATTERN自体にはキャプチャを含まないため、()で囲んでタグ自体を区切り文字として残す
-    parts = re.split(f"({TAG_PATTERN})", text)
+    return tokenize_emotions(text).segments
 
-    segments = []
-    buffer_text = ""
-
-    for part in parts:
-        # 分割結果がタグの形をしているか判定
-        if re.match(TAG_PATTERN, part):
-            # タグの中から感情名を取り出す
-            emotion_match = re.search(r"[A-Z]+", part)
-            if emotion_match:
-                emotion = emotion_match.group()
-                # バッファにあるテキストと、このタグの感情をセットにする
-                if buffer_text.strip():
-                    segments.append((buffer_text.strip(), emotion))
-                buffer_text = ""
-        else:
-            # タグでない部分はテキストとしてバッファに追加
-            buffer_text += part
 
-    # 末尾の処理（タグがない、またはタグ後のテキスト）
-    if buffer_text.strip():
-        # 直前の感情があればそれを引き継ぐ、なければNORMAL
-        last_emotion = segments[-1][1] if segments else "NORMAL"
-        segments.append((buffer_text.strip(), last_emotion))
+class EmotionStreamParser:
+    """
+    逐次入力されるテキスト (LLMのストリーミング応答など) を解析し、
+    タグが閉じた時点で確定したセグメントを返すパーサー．
+    """
 
-    return segments
+    def __init__(self):
+        self._buffer = ""
+        # 未確定のタグが始まり得る位置 (これより前は再走査しない)
+        self._scan_pos = 0
+        self.last_emotion = None
+
+    def feed(self, chunk: str) -> list:
+        """テキストを追加し、新たに確定したセグメントを返す"""
+        self._buffer += chunk
+        segments = []
+        pos = 0
+
+        for match in _TAG_RE.finditer(self._buffer, self._scan_pos):
+            text = self._buffer[pos : match.start()].strip()
+            emotion = match.group(1)
+            if text:
+                segments.append((text, emotion))
+                self.last_emotion = emotion
+            pos = match.end()
+
+        # 途中までしか届いていないタグは、最後の開き括弧からしか始まり得ない
+        if pos:
+            self._buffer = self._buffer[pos:]
+            start, fallback = 0, len(self._buffer)
+        else:
+            # 新しく届いた部分に開き括弧がなければ前回の位置を維持する
+            start, fallback = len(self._buffer) - len(chunk), self._scan_pos
+        opener = max(self._buffer.rfind(c, start) for c in _TAG_OPENERS)
+        self._scan_pos = opener if opener >= 0 else fallback
+        return segments
+
+    def close(self) -> list:
+        """残りのテキストを直前の感情 (なければNORMAL) で確定させる"""
+        tail = self._buffer.strip()
+        self._buffer = ""
+        self._scan_pos = 0
+        if not tail:
+            return []
+        return [(tail, self.last_emotion or "NORMAL")]
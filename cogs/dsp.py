@@ -0,0 +1,31 @@
+import logging
+
+# Rust拡張モジュールのインポート
+try:
+    import rust_core
+except ImportError:
+    print("[CRITICAL] 'rust_core' module not found.")
+    rust_core = None
+
+logger = logging.getLogger(__name__)
+
+
+def render_pcm(wav_bytes: bytes):
+    """
+    WAVデータを Rust パイプラインで Discord 用の PCM に加工する．
+    プロセスプールからも呼べるようモジュール直下に置いている．
+    """
+    if not rust_core:
+        return None
+
+    # Trim(100) -> Gain(3.0dB) -> Reverb(50ms, 0.3, 0.15)
+    # パラメータは必要に応じて設定ファイルから読み込む形にしても良い
+    return rust_core.process_audio_pipeline(
+        wav_bytes,
+        3.0,  # Gain dB
+        100,  # Silence Threshold
+        True,  # Reverb Enabled
+        50,  # Delay ms
+        0.3,  # Decay
+        0.15,  # Mix
+    )
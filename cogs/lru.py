@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+from .metrics import metrics
+
+
+class LRUCache:
+    """
+    スレッドセーフな LRU キャッシュ．
+    合成スレッドから並行して参照されるためロックで保護する．
+    name を指定するとヒット率を cache_requests_total{cache=name} に記録する．
+    max_bytes を指定すると値の len() の合計もその範囲に収める (0で無制限)．
+    """
+
+    def __init__(self, maxsize: int, name: str | None = None, max_bytes: int = 0):
+        self.maxsize = max(0, int(maxsize))
+        self.max_bytes = max(0, int(max_bytes))
+        self.name = name
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                hit = False
+                value = default
+            else:
+                hit = True
+                self._data.move_to_end(key)
+        if self.name:
+            metrics.cache_lookup(self.name, hit)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        size = len(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and self.max_bytes:
+                self.total_bytes -= len(old)
+            self._data[key] = value
+            self.total_bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes and self.total_bytes > self.max_bytes
+            ):
+                _, evicted = self._data.popitem(last=False)
+                if self.max_bytes:
+                    self.total_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
@@ -0,0 +1,204 @@
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# 秒単位のヒストグラムの既定バケット
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """累積しない形でバケットごとの件数を持つヒストグラム"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """バケット内を線形補間して分位点を推定する"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i >= len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    プロセス内の簡易メトリクス (カウンタ / ゲージ / ヒストグラム)．
+    ラベルはキーワード引数で渡し、(名前, ラベル) ごとに集計する．
+    合成スレッドからも呼ばれるためロックで保護する．
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+        # 出力時に値を集める関数 (キューの深さなど)
+        self._gauge_callbacks = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def counter(self, name: str, **labels) -> float:
+        """ラベルを指定した場合はその系列、省略した場合は全系列の合計を返す"""
+        with self._lock:
+            if labels:
+                return self._counters.get(self._key(name, labels), 0)
+            return sum(v for (n, _), v in self._counters.items() if n == name)
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def register_gauge(self, name: str, callback):
+        """
+        出力のたびに呼ばれるゲージを登録する．
+        callback は [(ラベルの辞書, 値), ...] を返す．
+        """
+        with self._lock:
+            self._gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """指定したラベルに一致する系列をまとめたヒストグラムを返す"""
+        wanted = set(self._key(name, labels)[1])
+        merged = None
+        with self._lock:
+            for (n, key_labels), hist in self._histograms.items():
+                if n != name or not wanted <= set(key_labels):
+                    continue
+                if merged is None:
+                    merged = Histogram(hist.buckets)
+                merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+                merged.count += hist.count
+                merged.sum += hist.sum
+        return merged or Histogram()
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    def cache_hit_rate(self, cache: str) -> float | None:
+        hits = self.counter("cache_requests_total", cache=cache, result="hit")
+        misses = self.counter("cache_requests_total", cache=cache, result="miss")
+        total = hits + misses
+        return hits / total if total else None
+
+    def cache_names(self) -> list[str]:
+        with self._lock:
+            return sorted(
+                {
+                    dict(labels)["cache"]
+                    for (n, labels) in self._counters
+                    if n == "cache_requests_total"
+                }
+            )
+
+    def _collect_gauges(self) -> dict:
+        with self._lock:
+            gauges = dict(self._gauges)
+            callbacks = list(self._gauge_callbacks.items())
+        for name, callback in callbacks:
+            try:
+                for labels, value in callback():
+                    gauges[self._key(name, labels)] = value
+            except Exception as e:
+                logger.error(f"Gauge callback failed ({name}): {e}")
+        return gauges
+
+    def render_prometheus(self) -> str:
+        """Prometheus のテキスト形式で出力する"""
+
+        def _fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            body = ",".join(
+                '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                for k, v in pairs
+            )
+            return "{" + body + "}"
+
+        gauges = self._collect_gauges()
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (hist.buckets, list(hist.counts), hist.count, hist.sum)
+                for key, hist in self._histograms.items()
+            }
+
+        lines = []
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            typed = set()
+            for (name, labels), value in sorted(series.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{name}{_fmt(labels)} {value}")
+
+        typed = set()
+        for (name, labels), (buckets, counts, count, total) in sorted(
+            histograms.items()
+        ):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for le, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_fmt(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_bucket{_fmt(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_fmt(labels)} {total}")
+            lines.append(f"{name}_count{_fmt(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Bot全体で共有するレジストリ
+metrics = MetricsRegistry()
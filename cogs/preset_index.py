@@ -0,0 +1,108 @@
+import heapq
+import unicodedata
+
+# 検索キーから除去する記号 (NFKC後の半角表記)
+_STRIP_CHARS = str.maketrans("", "", " ()_-・")
+
+# カタカナ (ァ〜ヶ) をひらがなへ寄せるためのオフセット
+_KATA_START = 0x30A1
+_KATA_END = 0x30F6
+_KANA_OFFSET = 0x60
+
+
+def normalize_preset_text(text: str) -> str:
+    """
+    検索用にテキストを正規化する．
+    - NFKC で全角英数・半角カナを統一
+    - 大文字小文字を無視 (casefold)
+    - カタカナをひらがなに寄せる
+    - 空白や括弧などの区切り記号を除去
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(
+        chr(ord(c) - _KANA_OFFSET) if _KATA_START <= ord(c) <= _KATA_END else c
+        for c in text
+    )
+    return text.translate(_STRIP_CHARS)
+
+
+class PresetIndex:
+    """
+    プリセット名の n-gram 転置インデックス．
+    オートコンプリートのたびに全件を走査しないよう、正規化済みのキーと
+    1-gram / 2-gram のポスティングリストを事前に構築しておく．
+    プリセット一覧が変化したときだけ再構築する．
+    """
+
+    # あいまい一致として採用する最低スコア (2-gram の Dice 係数)
+    FUZZY_THRESHOLD = 0.4
+
+    def __init__(self, limit: int = 25):
+        self.limit = limit
+        self._signature = None
+        self._presets: list[str] = []
+        self._keys: list[str] = []
+        self._gram_counts: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+
+    @staticmethod
+    def _grams(key: str) -> set[str]:
+        if len(key) < 2:
+            return {key} if key else set()
+        return {key[i : i + 2] for i in range(len(key) - 1)}
+
+    def ensure(self, presets: list[str]) -> bool:
+        """一覧が前回と異なる場合のみ再構築する．再構築したら True を返す"""
+        signature = hash(tuple(presets))
+        if signature == self._signature and len(presets) == len(self._presets):
+            return False
+        self.rebuild(presets)
+        self._signature = signature
+        return True
+
+    def rebuild(self, presets: list[str]):
+        self._presets = list(presets)
+        self._keys = [normalize_preset_text(p) for p in self._presets]
+        self._gram_counts = []
+        postings: dict[str, list[int]] = {}
+
+        for idx, key in enumerate(self._keys):
+            grams = self._grams(key)
+            self._gram_counts.append(len(grams))
+            # 1文字クエリ用に単一文字もインデックスする
+            for gram in grams | set(key):
+                postings.setdefault(gram, []).append(idx)
+
+        self._postings = postings
+
+    def search(self, query: str, limit: int | None = None) -> list[str]:
+        """
+        クエリに一致するプリセットを順位付けして返す．
+        完全一致 > 前方一致 > 部分一致 (出現位置が前ほど上位) > あいまい一致
+        """
+        limit = limit or self.limit
+        q = normalize_preset_text(query)
+        if not q:
+            return self._presets[:limit]
+
+        q_grams = self._grams(q)
+        hits: dict[int, int] = {}
+        for gram in q_grams:
+            for idx in self._postings.get(gram, ()):
+                hits[idx] = hits.get(idx, 0) + 1
+
+        ranked = []
+        for idx, count in hits.items():
+            key = self._keys[idx]
+            if count == len(q_grams):
+                pos = key.find(q)
+                if pos >= 0:
+                    tier = 0 if key == q else (1 if pos == 0 else 2)
+                    ranked.append((tier, pos, len(key), idx))
+                    continue
+            # 2-gram の重なりによる Dice 係数であいまい一致を判定する
+            score = 2 * count / (len(q_grams) + self._gram_counts[idx])
+            if score >= self.FUZZY_THRESHOLD:
+                ranked.append((3, -score, len(key), idx))
+
+        return [self._presets[r[3]] for r in heapq.nsmallest(limit, ranked)]
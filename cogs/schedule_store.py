@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alarms (
+    id TEXT PRIMARY KEY,
+    time TEXT NOT NULL,
+    message TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER,
+    repeat INTEGER NOT NULL,
+    next_fire REAL
+);
+CREATE TABLE IF NOT EXISTS timers (
+    id TEXT PRIMARY KEY,
+    end_time REAL NOT NULL,
+    minutes INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER
+);
+"""
+
+
+class ScheduleStore:
+    """
+    アラーム・タイマーの永続化ストア (SQLite WAL モード)．
+    1件ごとの差分書き込みを専用スレッドで行い、イベントループを止めない．
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # SQLite の接続はこのスレッドからのみ使用する
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="schedule-store"
+        )
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        except Exception as e:
+            logger.error(f"Schedule store error ({func.__name__}): {e}")
+            return None
+
+    # --- 読み込み ---
+    def _load_sync(self):
+        conn = self._connection()
+        alarms = []
+        for row in conn.execute(
+            "SELECT id, time, message, user_id, channel_id, repeat, next_fire "
+            "FROM alarms ORDER BY rowid"
+        ):
+            alarm = {
+                "id": row[0],
+                "time": row[1],
+                "message": row[2],
+                "user_id": row[3],
+                "channel_id": row[4],
+                "repeat": bool(row[5]),
+            }
+            next_fire = datetime.fromtimestamp(row[6]) if row[6] else None
+            alarms.append((alarm, next_fire))
+
+        timers = [
+            {
+                "id": row[0],
+                "end_time": datetime.fromtimestamp(row[1]),
+                "minutes": row[2],
+                "user_id": row[3],
+                "channel_id": row[4],
+            }
+            for row in conn.execute(
+                "SELECT id, end_time, minutes, user_id, channel_id "
+                "FROM timers ORDER BY end_time"
+            )
+        ]
+        return alarms, timers
+
+    async def load(self):
+        """
+        保存済みのアラームとタイマーを読み込む．
+        戻り値: ([(alarm, next_fire), ...], [timer, ...])
+        """
+        return await self._run(self._load_sync) or ([], [])
+
+    # --- 差分書き込み ---
+    def _save_alarms_sync(self, items):
+        # まとめて1つのトランザクションで書き込む (途中で失敗したら1件も残らない)
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT INTO alarms "
+                "(id, time, message, user_id, channel_id, repeat, next_fire) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET next_fire = excluded.next_fire",
+                [
+                    (
+                        alarm["id"],
+                        alarm["time"],
+                        alarm["message"],
+                        alarm["user_id"],
+                        alarm.get("channel_id"),
+                        int(alarm["repeat"]),
+                        next_fire.timestamp() if next_fire else None,
+                    )
+                    for alarm, next_fire in items
+                ],
+            )
+        return True
+
+    def _save_timer_sync(self, timer):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO timers "
+                "(id, end_time, minutes, user_id, channel_id) VALUES (?, ?, ?, ?, ?)",
+                (
+                    timer["id"],
+                    timer["end_time"].timestamp(),
+                    timer["minutes"],
+                    timer["user_id"],
+                    timer.get("channel_id"),
+                ),
+            )
+
+    def _delete_sync(self, table, item_id):
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (item_id,))
+
+    async def save_alarm(self, alarm: dict, next_fire: datetime | None) -> bool:
+        return await self.save_alarms([(alarm, next_fire)])
+
+    async def save_alarms(self, items: list) -> bool:
+        """[(alarm, next_fire), ...] を保存する．すべて保存できたら True"""
+        return bool(await self._run(self._save_alarms_sync, items))
+
+    async def delete_alarm(self, alarm_id: str):
+        await self._run(self._delete_sync, "alarms", alarm_id)
+
+    async def save_timer(self, timer: dict):
+        await self._run(self._save_timer_sync, timer)
+
+    async def delete_timer(self, timer_id: str):
+        await self._run(self._delete_sync, "timers", timer_id)
+
+    def _close_sync(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self):
+        # 未完了の書き込みを流してから接続を閉じる
+        self._executor.submit(self._close_sync)
+        self._executor.shutdown(wait=True)
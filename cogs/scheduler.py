@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleHandle:
+    """Scheduler.call_at が返すハンドル (asyncio.TimerHandle に相当)"""
+
+    __slots__ = ("_scheduler", "args", "callback", "cancelled", "seq", "when")
+
+    def __init__(self, when, seq, callback, args, scheduler):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+
+    def __lt__(self, other):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            # 発火済み (ヒープから取り出し済み) のハンドルは数えない
+            if self._scheduler:
+                self._scheduler._on_cancel()
+
+
+class Scheduler:
+    """
+    最小ヒープで次の発火時刻を管理するスケジューラ．
+    先頭の期限まで眠り続けるため、待機中は登録数に関係なくコストがかからない．
+    - call_at: O(log n)
+    - cancel: O(1) (遅延削除。取り消し済みが半数を超えたらヒープを再構築する)
+    """
+
+    # 時計の補正 (NTP同期・スリープ復帰) に追従するための最大待機秒数
+    MAX_SLEEP = 60.0
+
+    def __init__(self):
+        self._heap: list[ScheduleHandle] = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._running_tasks = set()
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._running_tasks):
+            task.cancel()
+
+    def call_at(self, when: datetime, callback, *args) -> ScheduleHandle:
+        """
+        指定時刻に callback(*args) を実行する．
+        callback は通常の関数・コルーチン関数のどちらでもよい．
+        """
+        handle = ScheduleHandle(
+            when.timestamp(), next(self._counter), callback, args, self
+        )
+        heapq.heappush(self._heap, handle)
+        # 先頭が変わった場合のみ待機中のループを起こす
+        if self._heap[0] is handle:
+            self._wakeup.set()
+        return handle
+
+    def _on_cancel(self):
+        self._cancelled += 1
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [h for h in self._heap if not h.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _pop_due(self, now: float) -> list[ScheduleHandle]:
+        due = []
+        while self._heap and self._heap[0].when <= now:
+            handle = heapq.heappop(self._heap)
+            if handle.cancelled:
+                self._cancelled -= 1
+            else:
+                handle._scheduler = None
+                due.append(handle)
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            # 期限を過ぎた取り消し済みのエントリも含めて先頭から取り出す
+            for handle in self._pop_due(time.time()):
+                self._dispatch(handle)
+
+            if self._heap:
+                timeout = min(self._heap[0].when - time.time(), self.MAX_SLEEP)
+            else:
+                timeout = None
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    def _dispatch(self, handle: ScheduleHandle):
+        try:
+            result = handle.callback(*handle.args)
+        except Exception as e:
+            logger.error(f"Scheduled callback failed: {e}")
+            return
+
+        if asyncio.iscoroutine(result):
+            task = asyncio.get_running_loop().create_task(self._guard(result))
+            self._running_tasks.add(task)
+            task.add_done_callback(self._running_tasks.discard)
+
+    async def _guard(self, coro):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled task failed: {e}")
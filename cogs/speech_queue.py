@@ -0,0 +1,175 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from .cancellation import CancelToken
+
+# 優先度 (値が小さいほど先に読み上げる)
+PRIORITY_ALARM = 0  # アラーム・タイマー通知
+PRIORITY_REPLY = 1  # LLMの返答・コマンドへの応答
+PRIORITY_AMBIENT = 2  # 入退室・ミュートなどの状態変化
+
+LANE_NAMES = {
+    PRIORITY_ALARM: "alarm",
+    PRIORITY_REPLY: "reply",
+    PRIORITY_AMBIENT: "ambient",
+}
+
+# キューが上限に達したときの破棄方針
+SHED_DROP_OLDEST = "drop_oldest"  # 最も古いジョブを捨てる
+SHED_DROP_LOWEST = "drop_lowest"  # 最も優先度の低いレーンの最も古いジョブを捨てる
+SHED_REJECT = "reject"  # 新しいジョブを受け付けない
+SHED_POLICIES = (SHED_DROP_OLDEST, SHED_DROP_LOWEST, SHED_REJECT)
+
+
+@dataclass(eq=False)
+class SpeechJob:
+    """読み上げキューに積む1件分の発話"""
+
+    vc_client: object
+    text: str
+    emotion: str
+    priority: int = PRIORITY_REPLY
+    # 同じキーの未処理ジョブがあれば新しいもので置き換える (連続トグルの集約用)
+    merge_key: object = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # /stop や切断で取り消されたら合成・再生を打ち切る
+    cancel_token: CancelToken = field(default_factory=CancelToken)
+    # 区間計測 (UtteranceTrace)．None なら計測しない
+    trace: object = None
+    # まとめて合成するセグメント [(テキスト, 感情), ...]．None なら text を1件で合成する
+    segments: list | None = None
+    # 合成に使った声 (エンジンが返した場合のみ．音声キャッシュの確認に使う)
+    voice: str | None = None
+
+
+class LaneStats:
+    """レーンごとの待ち時間と破棄件数"""
+
+    def __init__(self, window: int = 200):
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.merged = 0
+        self.dropped = 0  # 最大待ち時間を超えて破棄
+        self.shed = 0  # キューの上限により破棄
+        self._recent = deque(maxlen=window)
+
+    def record(self, wait: float):
+        self.count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._recent.append(wait)
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.count if self.count else 0.0
+
+    @property
+    def p95_wait(self) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class SpeechQueue(asyncio.Queue):
+    """
+    優先度レーン付きの読み上げキュー (asyncio.Queue 互換)．
+    高い優先度のレーンから順に取り出し、同じレーン内は先入れ先出し．
+    maxsize を超える追加は shed_policy に従って古いものを捨てるか拒否する．
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        max_age: dict | None = None,
+        shed_policy: str = SHED_DROP_LOWEST,
+    ):
+        super().__init__(maxsize)
+        # レーンごとの最大待ち時間 (秒)．これを過ぎたジョブは読み上げずに捨てる
+        self.max_age = max_age or {}
+        if shed_policy not in SHED_POLICIES:
+            raise ValueError(f"Unknown shed policy: {shed_policy}")
+        self.shed_policy = shed_policy
+
+    def _init(self, maxsize):
+        self._lanes = {priority: deque() for priority in LANE_NAMES}
+        self._merge_index = {}
+        self.stats = {priority: LaneStats() for priority in LANE_NAMES}
+
+    def qsize(self):
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def empty(self):
+        return not any(self._lanes.values())
+
+    def _put(self, job: SpeechJob):
+        if job.merge_key is not None:
+            self._merge_index[job.merge_key] = job
+        self._lanes[job.priority].append(job)
+
+    def _discard(self, job: SpeechJob):
+        """未処理のジョブを取り除き、処理済みとして数える"""
+        self._lanes[job.priority].remove(job)
+        if self._merge_index.get(job.merge_key) is job:
+            del self._merge_index[job.merge_key]
+        self.task_done()
+
+    def _select_victim(self, job: SpeechJob) -> SpeechJob:
+        """上限に達したときに捨てるジョブを選ぶ (新しいジョブ自身の場合もある)"""
+        if self.shed_policy == SHED_DROP_OLDEST:
+            heads = [lane[0] for lane in self._lanes.values() if lane]
+            return min(heads, key=lambda j: j.enqueued_at)
+
+        if self.shed_policy == SHED_DROP_LOWEST:
+            for priority in reversed(self._lanes):
+                lane = self._lanes[priority]
+                if lane:
+                    # 新しいジョブより優先度の高いものしかなければ新しい方を捨てる
+                    return lane[0] if priority >= job.priority else job
+
+        return job
+
+    def offer(self, job: SpeechJob) -> bool:
+        """
+        ジョブを追加する．受け付けた場合は True、破棄した場合は False を返す．
+        merge_key が同じ未処理のジョブは新しいもので置き換える．
+        """
+        if job.merge_key is not None:
+            old = self._merge_index.get(job.merge_key)
+            if old is not None:
+                self._discard(old)
+                self.stats[old.priority].merged += 1
+
+        if self.full():
+            victim = self._select_victim(job)
+            self.stats[victim.priority].shed += 1
+            if victim is job:
+                return False
+            self._discard(victim)
+
+        self.put_nowait(job)
+        return True
+
+    def _get(self) -> SpeechJob:
+        for priority, lane in self._lanes.items():
+            if lane:
+                job = lane.popleft()
+                if self._merge_index.get(job.merge_key) is job:
+                    del self._merge_index[job.merge_key]
+                self.stats[priority].record(time.monotonic() - job.enqueued_at)
+                return job
+        raise asyncio.QueueEmpty
+
+    def is_stale(self, job: SpeechJob) -> bool:
+        """最大待ち時間を過ぎたジョブなら破棄件数に数えて True を返す"""
+        max_age = self.max_age.get(job.priority)
+        if max_age is not None and time.monotonic() - job.enqueued_at > max_age:
+            self.stats[job.priority].dropped += 1
+            return True
+        return False
+
+    def lane_depths(self) -> dict:
+        return {LANE_NAMES[p]: len(lane) for p, lane in self._lanes.items()}
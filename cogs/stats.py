@@ -0,0 +1,101 @@
+import logging
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+import settings
+
+from .metrics import metrics
+from .tracing import STAGES
+
+logger = logging.getLogger(__name__)
+
+
+class StatsSystem(commands.Cog):
+    """
+    メトリクスの確認用．
+    /stats で主要な値を表示し、METRICS_PORT を設定した場合は
+    Prometheus 形式のテキストを http://METRICS_HOST:METRICS_PORT/metrics で公開する．
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._runner = None
+
+    async def cog_load(self):
+        port = getattr(settings, "METRICS_PORT", 0)
+        if not port:
+            return
+
+        host = getattr(settings, "METRICS_HOST", "127.0.0.1")
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, host, port).start()
+            logger.info(f"Metrics endpoint: http://{host}:{port}/metrics")
+        except OSError as e:
+            logger.error(f"Failed to start metrics endpoint: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def cog_unload(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle_metrics(self, request):
+        return web.Response(
+            text=metrics.render_prometheus(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    @app_commands.command(name="stats", description="読み上げ・LLMの処理時間の統計")
+    async def stats(self, interaction: discord.Interaction):
+        def _fmt(hist):
+            if not hist.count:
+                return "-"
+            return (
+                f"p50 {hist.quantile(0.5) * 1000:.0f}ms"
+                f" / p95 {hist.quantile(0.95) * 1000:.0f}ms"
+                f" ({hist.count}件)"
+            )
+
+        guild_id = interaction.guild.id if interaction.guild else None
+        lines = ["**読み上げ (このサーバー)**"]
+        for stage in STAGES:
+            hist = metrics.histogram("tts_stage_seconds", stage=stage, guild=guild_id)
+            lines.append(f"`{stage:<11}` {_fmt(hist)}")
+        lines.append(
+            f"`{'first frame':<11}` "
+            + _fmt(metrics.histogram("tts_time_to_first_frame_seconds", guild=guild_id))
+        )
+
+        lines.append("**LLM**")
+        lines.append(
+            f"`{'latency':<11}` {_fmt(metrics.histogram('llm_request_seconds'))}"
+        )
+        errors = metrics.counter("llm_errors_total")
+        if errors:
+            lines.append(f"`{'errors':<11}` {errors:.0f}件")
+
+        caches = metrics.cache_names()
+        if caches:
+            lines.append("**キャッシュ**")
+            for cache in caches:
+                rate = metrics.cache_hit_rate(cache)
+                lines.append(f"`{cache:<11}` ヒット率 {rate * 100:.1f}%")
+
+        cancelled = metrics.counter("speech_cancelled_total")
+        if cancelled:
+            lines.append(f"取り消し {cancelled:.0f}件")
+
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(StatsSystem(bot))
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SynthesisExecutor:
+    """
+    音声合成専用の実行器．
+    エンジン呼び出しはエンジンの同時処理数に合わせたスレッドプールで実行し、
+    discord.py などが使う既定のスレッドプールと取り合わないようにする．
+    DSP は別のプール (スレッド / プロセス) で実行する．
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        workers: int = 1,
+        dsp_workers: int = 1,
+        dsp_processes: int = 0,
+    ):
+        self.engine = engine
+        self.workers = max(1, int(workers))
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=f"tts-{engine}"
+        )
+        if dsp_processes > 0:
+            self._dsp_pool = ProcessPoolExecutor(max_workers=dsp_processes)
+            self.dsp_mode = "process"
+        else:
+            self._dsp_pool = ThreadPoolExecutor(
+                max_workers=max(1, int(dsp_workers)), thread_name_prefix="tts-dsp"
+            )
+            self.dsp_mode = "thread"
+
+        # 投入済み (開始待ち + 実行中) の件数．イベントループ側でのみ更新する
+        self.inflight = 0
+        self.dsp_inflight = 0
+
+    async def run(self, func, *args, stage: str = "engine"):
+        """
+        エンジン呼び出しを専用スレッドで実行し、待ち時間と実行時間を記録する．
+        合成以外の呼び出し (ウォームアップなど) は stage を変えて区別する．
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        started = None
+        self.inflight += 1
+
+        def _call():
+            nonlocal started
+            started = time.perf_counter()
+            return func(*args)
+
+        try:
+            return await loop.run_in_executor(self._pool, _call)
+        finally:
+            self.inflight -= 1
+            finished = time.perf_counter()
+            if started is not None:
+                self._record(stage, started - submitted, finished - started)
+
+    async def run_dsp(self, func, *args):
+        """DSP を実行する．プロセスプールの場合 func はモジュール直下の関数であること"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.dsp_inflight += 1
+        try:
+            return await loop.run_in_executor(self._dsp_pool, func, *args)
+        finally:
+            self.dsp_inflight -= 1
+            # プロセスプールでは開始時刻が取れないため待ち時間を含めて記録する
+            self._record("dsp", None, time.perf_counter() - started)
+
+    def _record(self, stage: str, queued: float | None, ran: float):
+        labels = {"engine": self.engine, "stage": stage}
+        metrics.inc("synthesis_jobs_total", **labels)
+        metrics.inc("synthesis_run_seconds_total", ran, **labels)
+        if queued is not None:
+            metrics.inc("synthesis_queue_seconds_total", queued, **labels)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._dsp_pool.shutdown(wait=False, cancel_futures=True)
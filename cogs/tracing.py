@@ -0,0 +1,94 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 1件の読み上げの各区間 (この順に進む)
+STAGES = (
+    "queue_wait",  # キュー投入から合成開始まで
+    "dictionary",  # 辞書置換
+    "engine",  # TTSエンジンでの合成
+    "file_io",  # 一時ファイルの読み込み・削除
+    "dsp",  # Rust DSP
+    "first_frame",  # DSP完了から最初のフレーム送出まで
+    "playback",  # 最初のフレームから最後のフレームまで
+)
+
+
+class UtteranceTrace:
+    """
+    読み上げ1件分の区間計測．
+    各区間の時間を tts_stage_seconds{stage, engine, guild} に記録し、
+    再生終了時に内訳をデバッグログへ出力する．
+    合成スレッド・再生スレッドからも呼ばれるが、区間ごとに書き込む場所が異なるためロックは不要．
+    """
+
+    def __init__(self, engine: str, guild_id, text: str = ""):
+        self.engine = engine
+        self.guild_id = guild_id
+        self.text = text
+        self.enqueued_at = time.perf_counter()
+        self.first_frame_at = None
+        self.spans = {}
+        self._last = self.enqueued_at
+        self._finished = False
+
+    def observe(self, stage: str, seconds: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+        metrics.observe(
+            "tts_stage_seconds",
+            seconds,
+            stage=stage,
+            engine=self.engine,
+            guild=self.guild_id,
+        )
+
+    def mark(self, stage: str):
+        """前回の区切りからの経過時間を stage として記録する"""
+        now = time.perf_counter()
+        self.observe(stage, now - self._last)
+        self._last = now
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.observe(stage, now - started)
+            self._last = now
+
+    def first_frame(self):
+        """最初のフレームを送り出したとき (再生スレッド上) に呼ばれる"""
+        self.mark("first_frame")
+        self.first_frame_at = self._last
+        metrics.observe(
+            "tts_time_to_first_frame_seconds",
+            self._last - self.enqueued_at,
+            engine=self.engine,
+            guild=self.guild_id,
+        )
+
+    def finish(self):
+        """最後のフレームを送り出したときに呼ばれる"""
+        if self._finished:
+            return
+        self._finished = True
+        self.mark("playback")
+        total = self._last - self.enqueued_at
+        metrics.observe(
+            "tts_utterance_seconds", total, engine=self.engine, guild=self.guild_id
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            breakdown = " ".join(
+                f"{stage}={self.spans[stage] * 1000:.0f}ms"
+                for stage in STAGES
+                if stage in self.spans
+            )
+            logger.debug(
+                f"Utterance [{self.text[:20]}] {total * 1000:.0f}ms: {breakdown}"
+            )
@@ -1,17 +1,105 @@
-from .aivoice import AIVoiceProvider
-from .voicevox import VoicevoxProvider
+import importlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 追加のエンジンを提供するパッケージが登録する entry point のグループ名
+#   [project.entry-points."tts_discord_bot.engines"]
+#   myengine = "my_package.engine:MyEngineProvider"
+ENTRY_POINT_GROUP = "tts_discord_bot.engines"
 
-def get_tts_provider(engine_name: str):
+# 既定のエンジン (TTS_ENGINE で指定されたとき初めて読み込む)
+DEFAULT_ENGINE = "aivoice"
+
+# エンジン名 -> (表示名, "モジュール:クラス名" またはプロバイダーのクラス)
+_registry = {
+    "aivoice": ("A.I.VOICE", f"{__name__}.aivoice:AIVoiceProvider"),
+    "voicevox": ("VOICEVOX", f"{__name__}.voicevox:VoicevoxProvider"),
+}
+_entry_points_loaded = False
+
+
+def register_engine(name: str, target, display_name: str | None = None):
+    """
+    エンジンを登録する．target は "モジュール:クラス名" の文字列
+    (get_tts_provider で選ばれたときに読み込む) か、プロバイダーのクラス．
+    """
+    _registry[name.lower()] = (display_name or name, target)
+
+
+def _load_entry_points():
+    """
+    entry point で提供されたエンジンを登録する (クラスの読み込みは選択時まで遅らせる)．
+    インストール済みパッケージを走査するため、登録済みでないエンジン名を
+    引いたときだけ呼ぶ．
+    """
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    try:
+        from importlib.metadata import entry_points
+
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name.lower() not in _registry:
+                register_engine(ep.name, ep.value)
+    except Exception as e:
+        logger.error(f"Failed to load TTS engine entry points: {e}")
+
+
+def available_engines() -> dict[str, str]:
+    """登録済みのエンジン名 -> 表示名"""
+    _load_entry_points()
+    return {name: display_name for name, (display_name, _) in _registry.items()}
+
+
+def _is_registered(name: str) -> bool:
+    """name が登録済みなら True (見つからないときだけ entry point を走査する)"""
+    if name not in _registry:
+        _load_entry_points()
+    return name in _registry
+
+
+def load_engine(name: str):
+    """エンジン名からプロバイダーのクラスを読み込む"""
+    name = name.lower()
+    _is_registered(name)
+    display_name, target = _registry[name]
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        target = getattr(importlib.import_module(module_name), attr)
+        _registry[name] = (display_name, target)
+    return target
+
+
+def get_tts_provider(engine_name: str, fallback_engine: str | None = None):
+    """
+    エンジンのプロバイダーを作成する．
+    fallback_engine を指定すると、2つのエンジンを切り替えて使う
+    CompositeProvider を返す．
+    """
     engine_name = engine_name.lower()
 
-    if engine_name == "voicevox":
-        logger.info("TTS Engine selected: VOICEVOX")
-        return VoicevoxProvider()
+    if not _is_registered(engine_name):
+        # デフォルトフォールバック
+        logger.warning(f"Unknown TTS engine: {engine_name}")
+        engine_name = DEFAULT_ENGINE
+
+    display_name, _ = _registry[engine_name]
+    logger.info(f"TTS Engine selected: {display_name}")
+    provider = load_engine(engine_name)()
+
+    fallback_engine = (fallback_engine or "").lower()
+    if not fallback_engine or fallback_engine == engine_name:
+        return provider
+    if not _is_registered(fallback_engine):
+        logger.warning(f"Unknown fallback TTS engine: {fallback_engine}")
+        return provider
+
+    # 切り替えを使うときだけ読み込む
+    from .composite import CompositeProvider
 
-    # デフォルトフォールバック
-    logger.info("TTS Engine selected: A.I.VOICE")
-    return AIVoiceProvider()
+    logger.info(f"TTS fallback engine: {_registry[fallback_engine][0]}")
+    return CompositeProvider(
+        engine_name, fallback_engine, provider, load_engine(fallback_engine)()
+    )
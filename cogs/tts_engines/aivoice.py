@@ -1,20 +1,46 @@
 import os
+import tempfile
 import time
 import logging
 
-# .NET Framework連携用のライブラリ読み込み
-try:
-    from pythonnet import load
-
-    load("netfx")
-except Exception as e:
-    print(f"[WARNING] Pythonnet load failed: {e}")
-
-import clr
 from .base import TTSProvider
+from ..cancellation import SynthesisCancelled
 
 logger = logging.getLogger(__name__)
 
+# pythonnet の clr モジュール (初回の initialize で読み込む。読み込めなければ False)
+_clr = None
+
+
+def _import_clr():
+    """
+    .NET Framework連携用のライブラリを読み込む．
+    読み込みに時間がかかり、Windows 以外では失敗するため、A.I.VOICE を使うときだけ行う．
+    """
+    global _clr
+    if _clr is None:
+        try:
+            from pythonnet import load
+
+            load("netfx")
+        except Exception as e:
+            logger.warning(f"Pythonnet load failed: {e}")
+
+        try:
+            import clr
+
+            _clr = clr
+        except ImportError:
+            # Windows 以外 (ベンチマーク実行環境など) では読み込めない
+            _clr = False
+    return _clr or None
+
+
+# 感情ごとのプリセットに付けるサフィックス (例: "キャラ名_JOY")
+PRESET_SUFFIXES = ["_JOY", "_SAD", "_ANGRY", "_SURPRISE", "_NORMAL", "_SAN"]
+# ウォームアップで書き出して捨てる文
+WARMUP_TEXT = "あ"
+
 
 class AIVoiceProvider(TTSProvider):
     """
@@ -35,6 +61,11 @@ class AIVoiceProvider(TTSProvider):
         )
 
     def initialize(self):
+        clr = _import_clr()
+        if clr is None:
+            logger.error("pythonnet (clr) is not available.")
+            return
+
         if not os.path.exists(self.dll_path):
             logger.error(f"A.I.VOICE DLL not found at: {self.dll_path}")
             return
@@ -46,7 +77,7 @@ class AIVoiceProvider(TTSProvider):
             self.tts_control = TtsControl()
             self.host_status = HostStatus
 
-            if not self._ensure_connection():
+            if not self._ensure_connection(launch_editor=True):
                 logger.warning("Failed to connect to A.I.VOICE Editor.")
 
             # ★ここが重要: VoicePresetNames を使用してユーザー作成プリセットを取得
@@ -63,12 +94,11 @@ class AIVoiceProvider(TTSProvider):
             logger.info("==================================")
 
             seen = set()
-            ignore_suffixes = ["_JOY", "_SAD", "_ANGRY", "_SURPRISE", "_NORMAL", "_SAN"]
 
             for name in self.all_presets:
                 # 表示用: サフィックスを除去してベース名を抽出
                 base_name = name
-                for suffix in ignore_suffixes:
+                for suffix in PRESET_SUFFIXES:
                     if base_name.endswith(suffix):
                         base_name = base_name[: -len(suffix)]
                         break
@@ -83,7 +113,12 @@ class AIVoiceProvider(TTSProvider):
         except Exception as e:
             logger.error(f"A.I.VOICE Init Error: {e}")
 
-    def _ensure_connection(self):
+    def _ensure_connection(self, launch_editor: bool = False):
+        """
+        エディタに接続済みか確認し、未接続なら接続する．
+        エディタの起動 (最大10秒待つ) は launch_editor のときだけ行う
+        (合成のたびに待たないよう、初期化とヘルスチェックからのみ起動する)．
+        """
         if not self.tts_control:
             return False
 
@@ -96,7 +131,7 @@ class AIVoiceProvider(TTSProvider):
         try:
             available_hosts = self.tts_control.GetAvailableHostNames()
 
-            if not available_hosts:
+            if not available_hosts and launch_editor:
                 editor_path = getattr(
                     os.getenv("AIVOICE_APP_PATH"),
                     "default",
@@ -131,7 +166,12 @@ class AIVoiceProvider(TTSProvider):
 
         return False
 
-    def generate_audio(self, text: str, emotion: str, output_path: str):
+    def generate_audio(
+        self, text: str, emotion: str, output_path: str, cancel_token=None
+    ):
+        # エディタ側の書き出しは中断できないため、取り消しは書き出しの直前まで確認する
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
         if not self._ensure_connection():
             return
 
@@ -173,12 +213,48 @@ class AIVoiceProvider(TTSProvider):
                 # 正しいプリセットが当たった場合はパラメータをリセット
                 self._apply_fallback_parameters("RESET")
 
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
             self.tts_control.Text = text
             self.tts_control.SaveAudioToFile(output_path)
 
+        except SynthesisCancelled:
+            raise
+
         except Exception as e:
             logger.error(f"A.I.VOICE Speak Error: {e}")
 
+    def health_check(self) -> bool:
+        return self._ensure_connection(launch_editor=True)
+
+    def warm_up(self):
+        """
+        現在のキャラクターの基本プリセットと感情プリセットを順に選択し、
+        短い文を一時ファイルに書き出して捨てる．
+        プリセットの選択だけでは声が読み込まれないため、実際に1回合成しておく．
+        """
+        base = self.current_base_preset
+        if not base or not self._ensure_connection():
+            return
+
+        with tempfile.TemporaryDirectory(prefix="aivoice-warmup-") as temp_dir:
+            output_path = os.path.join(temp_dir, "warmup.wav")
+            targets = [base] + [f"{base}{suffix}" for suffix in PRESET_SUFFIXES]
+            for name in targets:
+                if name not in self.all_presets:
+                    continue
+                started = time.perf_counter()
+                try:
+                    self.tts_control.CurrentVoicePresetName = name
+                    self.tts_control.Text = WARMUP_TEXT
+                    self.tts_control.SaveAudioToFile(output_path)
+                    logger.info(
+                        f"A.I.VOICE preset {name} warmed up in"
+                        f" {(time.perf_counter() - started) * 1000:.0f}ms"
+                    )
+                except Exception as e:
+                    logger.warning(f"A.I.VOICE warm-up error ({name}): {e}")
+
     def _apply_fallback_parameters(self, emotion):
         try:
             p, s, r, v = 1.0, 1.0, 1.0, 1.0
@@ -201,6 +277,9 @@ class AIVoiceProvider(TTSProvider):
         except Exception as e:
             logger.error(f"Fallback Param Error: {e}")
 
+    def current_voice(self) -> str | None:
+        return self.current_base_preset or None
+
     def get_presets(self) -> list[str]:
         self._ensure_connection()
         return self.display_presets
@@ -1,15 +1,90 @@
+import os
+import tempfile
 from abc import ABC, abstractmethod
+from typing import NamedTuple
+
+
+class OutputFormat(NamedTuple):
+    """エンジンが出力する WAV の形式"""
+
+    sample_rate: int
+    channels: int
+
+
+# Discord へ送る PCM の形式 (この形式で受け取れれば rust_core はリサンプルを省略する)
+DISCORD_OUTPUT_FORMAT = OutputFormat(48000, 2)
 
 
 class TTSProvider(ABC):
+    # negotiate_output_format で合意した出力形式 (None はエンジンの既定のまま)
+    output_format: OutputFormat | None = None
+    # synthesize_batch が複数のセグメントを1回の呼び出しで合成できるか
+    supports_batch = False
+
     @abstractmethod
     def initialize(self):
         pass
 
     @abstractmethod
-    def generate_audio(self, text: str, emotion: str, output_path: str):
+    def generate_audio(
+        self, text: str, emotion: str, output_path: str, cancel_token=None
+    ):
+        """
+        音声を output_path に書き出す．
+        cancel_token (CancelToken) が取り消された場合は、可能な時点で
+        SynthesisCancelled を送出して打ち切る．
+        実際に使った声を current_voice と同じ形式で返してもよい
+        (合成ごとにエンジンを選ぶプロバイダー用．None なら current_voice の声とみなす)．
+        """
         pass
 
+    def health_check(self) -> bool:
+        """
+        エンジンが合成できる状態なら True を返す．ヘルスモニターから定期的に呼ばれる．
+        既定の実装は常に True．
+        """
+        return True
+
+    def current_voice(self) -> str | None:
+        """
+        現在の声 (プリセット・スタイル) の識別子．合成済み音声のキャッシュのキーに使う．
+        特定できない場合は None (キャッシュしない)．
+        """
+        return None
+
+    def warm_up(self):
+        """
+        最初の合成が遅くならないよう、使う予定の声をエンジンに読み込ませておく．
+        initialize と set_preset の後に合成スレッドから呼ばれる．
+        既定の実装は何もしない．
+        """
+        pass
+
+    def synthesize_batch(self, segments: list, cancel_token=None) -> list:
+        """
+        セグメント [(テキスト, 感情), ...] をまとめて合成し、
+        それぞれの WAV のバイト列 (失敗したものは None) を同じ順で返す．
+        既定の実装は generate_audio を1件ずつ呼ぶ．
+        """
+        results = []
+        for text, emotion in segments:
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tf:
+                temp_path = tf.name
+            try:
+                self.generate_audio(text, emotion, temp_path, cancel_token=cancel_token)
+                with open(temp_path, "rb") as f:
+                    results.append(f.read() or None)
+            finally:
+                os.remove(temp_path)
+        return results
+
+    def negotiate_output_format(self, preferred: OutputFormat) -> OutputFormat | None:
+        """
+        preferred の形式で出力できるなら以降その形式で出力し、合意した形式を返す．
+        出力形式を指定できないエンジンは None を返す (既定の実装)．
+        """
+        return None
+
     @abstractmethod
     def get_presets(self) -> list[str]:
         pass
@@ -0,0 +1,444 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import settings
+
+from ..cancellation import CancelToken, SynthesisCancelled
+from ..consts import load_json
+from ..metrics import metrics
+from .base import OutputFormat, TTSProvider
+from .health import CLOSED, OPEN, CircuitBreaker, EngineUnavailable
+
+logger = logging.getLogger(__name__)
+
+# 合成時間の移動平均 (EWMA) の重み
+LATENCY_ALPHA = 0.2
+# 実測するまでの仮の合成時間 (秒)
+INITIAL_LATENCY = 1.0
+
+
+class EngineRoute:
+    """
+    CompositeProvider が束ねるエンジン1つ分の状態．
+    エンジンごとに専用のスレッドで合成する (同時合成数は SYNTH_WORKERS)．
+    声の切り替えは、そのエンジンで合成中のものがなくなるまで待ってから行う．
+    """
+
+    def __init__(
+        self,
+        name: str,
+        provider: TTSProvider,
+        voices: dict,
+        failure_threshold: int,
+        reset_timeout: float,
+        workers: int = 1,
+    ):
+        self.name = name
+        self.provider = provider
+        # キャラクター名 (または "キャラクター名:感情") -> このエンジンの声
+        self.voices = voices
+        self.default_voice = None
+        self.voice = None
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.workers = max(1, int(workers))
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=f"tts-{name}"
+        )
+        self.latency = INITIAL_LATENCY  # 合成時間の EWMA (秒)
+        self.sampled_at = 0.0
+        self.pending = 0  # 合成中・合成待ちの件数
+        self.busy_since = 0.0  # 実行中の合成を始めた時刻
+        self._lock = threading.Lock()
+        # 声の切り替えと合成を排他する (合成中の件数と、その間は声を変えない)
+        self._voice_cond = threading.Condition()
+        self._active = 0
+
+    def expected_latency(self, stale_after: float) -> float:
+        """
+        今このエンジンに投げた場合の合成完了までの見込み時間．
+        実行中の合成が平均より長引いていればその経過時間で見積もる．
+        しばらく使っていないエンジンは見込みを0とし、次の合成で実測し直す．
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.pending == 0:
+                return 0.0 if now - self.sampled_at > stale_after else self.latency
+            running = now - self.busy_since
+            # 並行して合成できる分だけ待ち時間は短くなる
+            return max(self.latency, running) * (self.pending // self.workers + 1)
+
+    def available(self) -> bool:
+        with self._lock:
+            return self.breaker.available()
+
+    def allow(self) -> bool:
+        """合成を1回投げてよければ True (HALF_OPEN では試行の枠を確保する)"""
+        with self._lock:
+            return self.breaker.allow()
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.breaker.state == OPEN
+
+    def healthy(self) -> bool:
+        with self._lock:
+            return self.breaker.state == CLOSED
+
+    def record(self, ok: bool, elapsed: float = 0.0):
+        with self._lock:
+            if ok:
+                self.breaker.record_success()
+                self.latency = (
+                    elapsed
+                    if not self.sampled_at
+                    else LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency
+                )
+                self.sampled_at = time.monotonic()
+            else:
+                self.breaker.record_failure()
+
+    def release(self):
+        with self._lock:
+            self.breaker.release()
+
+    def record_health(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.trip()
+
+    def resolve_voice(self, character: str | None, emotion: str) -> tuple:
+        """
+        キャラクターと感情からこのエンジンで使う (声, 感情) を決める．
+        感情ごとの声が割り当てられている場合は声で感情を表すため、感情は NORMAL にする．
+        割り当てがなければ default_voice (None ならエンジンの現在の声のまま)．
+        """
+        if character:
+            voice = self.voices.get(f"{character}:{emotion}")
+            if voice:
+                return voice, "NORMAL"
+            voice = self.voices.get(character)
+            if voice:
+                return voice, emotion
+        return self.default_voice, emotion
+
+    def submit(self, character, text, emotion, output_path, cancel_token):
+        with self._lock:
+            self.pending += 1
+        return self.pool.submit(
+            self._synthesize, character, text, emotion, output_path, cancel_token
+        )
+
+    def _synthesize(
+        self, character, text, emotion, output_path, cancel_token
+    ) -> str | None:
+        """
+        【エンジンのスレッド実行用】
+        output_path に書き出せたら使った声 ("エンジン名:声") を、
+        失敗したら None を返す．
+        """
+        with self._lock:
+            self.busy_since = time.monotonic()
+        started = time.perf_counter()
+        try:
+            cancel_token.raise_if_cancelled()
+            voice, engine_emotion = self.resolve_voice(character, emotion)
+            self._begin(voice)
+            try:
+                self.provider.generate_audio(
+                    text, engine_emotion, output_path, cancel_token=cancel_token
+                )
+                # 声を切り替えられる前に、合成に使った声を控えておく
+                used_voice = self.voice_id()
+            finally:
+                self._end()
+            ok = os.path.exists(output_path) and os.path.getsize(output_path) > 0
+        except SynthesisCancelled:
+            self.release()
+            return None
+        except Exception as e:
+            logger.error(f"{self.name}: generation failed: {e}")
+            ok = False
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+        # 取り消された (ヘッジで負けた) 合成は結果に数えない
+        if cancel_token.cancelled:
+            self.release()
+        else:
+            self.record(ok, time.perf_counter() - started)
+        if not ok:
+            return None
+        return used_voice
+
+    def _begin(self, voice):
+        """voice に切り替えて合成を始める (他の声で合成中なら終わるまで待つ)"""
+        with self._voice_cond:
+            if voice and voice != self.voice:
+                self._voice_cond.wait_for(lambda: self._active == 0)
+                if voice != self.voice:
+                    if self.provider.set_preset(voice):
+                        self.voice = voice
+                    else:
+                        logger.warning(f"{self.name}: voice not found: {voice}")
+            self._active += 1
+
+    def _end(self):
+        with self._voice_cond:
+            self._active -= 1
+            self._voice_cond.notify_all()
+
+    def voice_id(self) -> str:
+        return f"{self.name}:{self.provider.current_voice() or ''}"
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.provider.terminate()
+
+
+class CompositeProvider(TTSProvider):
+    """
+    メインと予備の2つのエンジンを束ね、合成ごとに使うエンジンを選ぶプロバイダー．
+
+    - サーキットブレーカーが開いているエンジンには投げない
+    - メインの合成見込み時間が予備より TTS_FAILOVER_MARGIN_MS 以上長ければ予備を使う
+    - メインで失敗したら予備で合成し直す
+    - TTS_HEDGE_AFTER_MS (0で無効) を過ぎても終わらなければ予備でも合成し、
+      先に終わった方を使う (遅い方は取り消す)
+
+    キャラクターはメインのエンジンのプリセット名で指定する．予備のエンジンでの声は
+    TTS_VOICE_MAP_PATH の JSON で指定する (なければ TTS_FALLBACK_CHARACTER)．
+        {"voicevox": {"琴葉 茜": "ずんだもん(ノーマル)",
+                      "琴葉 茜:JOY": "ずんだもん(あまあま)"}}
+    """
+
+    def __init__(
+        self,
+        primary: str,
+        secondary: str,
+        primary_provider: TTSProvider,
+        secondary_provider: TTSProvider,
+    ):
+        voice_map = load_json(
+            getattr(settings, "TTS_VOICE_MAP_PATH", "voice_map.json"), {}
+        )
+        failure_threshold = getattr(settings, "TTS_BREAKER_FAILURES", 3)
+        reset_timeout = getattr(settings, "TTS_BREAKER_RESET_SEC", 30.0)
+        workers = getattr(settings, "SYNTH_WORKERS", {})
+        self.routes = [
+            EngineRoute(
+                name,
+                provider,
+                voice_map.get(name, {}),
+                failure_threshold,
+                reset_timeout,
+                workers.get(name, 1),
+            )
+            for name, provider in (
+                (primary, primary_provider),
+                (secondary, secondary_provider),
+            )
+        ]
+        self.routes[1].default_voice = getattr(settings, "TTS_FALLBACK_CHARACTER", None)
+        self.hedge_after = getattr(settings, "TTS_HEDGE_AFTER_MS", 0) / 1000
+        self.margin = getattr(settings, "TTS_FAILOVER_MARGIN_MS", 1000) / 1000
+        # しばらく使っていないエンジンの見込み時間は当てにしない
+        self.stale_after = reset_timeout
+        self.character = None
+
+    @property
+    def engine_names(self) -> list[str]:
+        return [route.name for route in self.routes]
+
+    @property
+    def primary(self) -> EngineRoute:
+        return self.routes[0]
+
+    @property
+    def secondary(self) -> EngineRoute:
+        return self.routes[1]
+
+    def initialize(self):
+        for route in self.routes:
+            try:
+                route.provider.initialize()
+            except Exception as e:
+                logger.error(f"{route.name}: initialization failed: {e}")
+        # 各エンジンの声を設定しておく
+        for route in self.routes:
+            voice, _ = route.resolve_voice(self.character, "NORMAL")
+            if voice and route.provider.set_preset(voice):
+                route.voice = voice
+
+    def _plan(self) -> list:
+        """合成を試すエンジンを優先順に並べる (ブレーカーが開いているものは除く)"""
+        primary, secondary = self.routes
+        if not primary.available():
+            return [secondary] if secondary.available() else []
+        if not secondary.available():
+            return [primary]
+        if primary.expected_latency(self.stale_after) > (
+            secondary.expected_latency(self.stale_after) + self.margin
+        ):
+            return [secondary, primary]
+        return [primary, secondary]
+
+    def generate_audio(
+        self, text: str, emotion: str, output_path: str, cancel_token=None
+    ) -> str | None:
+        """合成に使ったエンジンの声 ("エンジン名:声") を返す"""
+        cancel_token = cancel_token or CancelToken()
+        routes = self._plan()
+        if not routes:
+            raise EngineUnavailable("no TTS engine available")
+
+        attempts = {}  # future -> (エンジン, 一時ファイル, 取り消しトークン)
+
+        def _submit(route):
+            # 並べてから投げるまでに HALF_OPEN の試行の枠を他の合成に取られたら飛ばす
+            if not route.allow():
+                return None
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tf:
+                temp_path = tf.name
+            token = CancelToken()
+            remove_callback = cancel_token.add_callback(token.cancel)
+            future = route.submit(self.character, text, emotion, temp_path, token)
+            attempts[future] = (route, temp_path, token, remove_callback)
+            metrics.inc("tts_route_total", engine=route.name)
+            return future
+
+        def _submit_next():
+            while routes:
+                future = _submit(routes.pop(0))
+                if future is not None:
+                    return future
+            return None
+
+        first = _submit_next()
+        if first is None:
+            raise EngineUnavailable("no TTS engine available")
+        pending = {first}
+        winner = None
+        try:
+            while pending and winner is None:
+                # ヘッジ: 予備が残っていれば一定時間で打ち切って並行させる
+                hedge = self.hedge_after if routes and len(pending) == 1 else None
+                done, pending = wait(
+                    pending, timeout=hedge or None, return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    metrics.inc("tts_hedged_total", engine=routes[0].name)
+                    future = _submit_next()
+                    if future is not None:
+                        pending.add(future)
+                    continue
+                for future in done:
+                    if future.result():
+                        winner = future
+                        break
+                else:
+                    if not pending and routes:
+                        # 失敗したので次のエンジンで合成し直す
+                        metrics.inc("tts_failover_total", engine=routes[0].name)
+                        future = _submit_next()
+                        if future is not None:
+                            pending.add(future)
+
+            cancel_token.raise_if_cancelled()
+            if winner is None:
+                return None
+            route, temp_path, _, _ = attempts[winner]
+            if route is not self.primary:
+                logger.info(f"Synthesized with fallback engine: {route.name}")
+            shutil.copyfile(temp_path, output_path)
+            return winner.result()
+        finally:
+            for future, (_, temp_path, token, remove_callback) in attempts.items():
+                remove_callback()
+                if not future.done():
+                    # 遅い方の合成は取り消し、終わりしだい一時ファイルを消す
+                    token.cancel()
+                    future.add_done_callback(
+                        lambda _f, path=temp_path: self._remove_temp(path)
+                    )
+                else:
+                    self._remove_temp(temp_path)
+
+    @staticmethod
+    def _remove_temp(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def health_check(self) -> bool:
+        """
+        各エンジンのヘルスチェックを専用のスレッドで実行し、ブレーカーに反映する．
+        どちらかが合成できれば True．
+        """
+        futures = [
+            (route, route.pool.submit(route.provider.health_check))
+            for route in self.routes
+            if not route.pending
+        ]
+        # 合成中のエンジンは合成の結果がブレーカーに反映されるため確認しない
+        healthy = any(route.pending and not route.is_open() for route in self.routes)
+        for route, future in futures:
+            try:
+                ok = bool(future.result(timeout=10))
+            except Exception:
+                ok = False
+            route.record_health(ok)
+            healthy = healthy or ok
+        return healthy
+
+    def current_voice(self) -> str | None:
+        # 予備のエンジンに切り替わっている間はキャッシュしない
+        if not self.primary.healthy():
+            return None
+        if self.primary.provider.current_voice() is None:
+            return None
+        return self.primary.voice_id()
+
+    def warm_up(self):
+        futures = [route.pool.submit(route.provider.warm_up) for route in self.routes]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.warning(f"Warm-up failed: {e}")
+
+    def negotiate_output_format(self, preferred: OutputFormat) -> OutputFormat | None:
+        formats = [
+            route.provider.negotiate_output_format(preferred) for route in self.routes
+        ]
+        # 両方のエンジンが同じ形式で出力できるときだけ合意する
+        return formats[0] if formats[0] == formats[1] else None
+
+    def get_presets(self) -> list[str]:
+        presets = self.primary.provider.get_presets()
+        if presets:
+            return presets
+        # メインのエンジンが起動していなければ予備の声を選べるようにする
+        return self.secondary.provider.get_presets()
+
+    def set_preset(self, preset_name: str) -> bool:
+        # 予備のエンジンの声は合成時に voice map から決める
+        for route in self.routes:
+            if route.provider.set_preset(preset_name):
+                route.default_voice = preset_name
+                route.voice = preset_name
+                self.character = preset_name
+                return True
+        return False
+
+    def terminate(self):
+        for route in self.routes:
+            route.close()
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# サーキットブレーカーの状態
+CLOSED = "closed"  # 正常．合成を通す
+OPEN = "open"  # 異常．合成を即座に失敗させる
+HALF_OPEN = "half_open"  # 復旧待ち．合成を試し、1回でも失敗したら OPEN に戻す
+
+# tts_circuit_state ゲージの値
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class EngineUnavailable(Exception):
+    """エンジンが異常と判定されているため合成しなかったときに送出する"""
+
+
+class CircuitBreaker:
+    """
+    エンジン1つ分のサーキットブレーカー．
+    合成が連続して failure_threshold 回失敗するか、ヘルスチェックに失敗すると
+    OPEN にし、reset_timeout 秒たつと HALF_OPEN にして1件だけ合成を試す．
+    呼び出し側でスレッド間の排他を行う (イベントループ上ではロック不要)．
+    """
+
+    def __init__(
+        self, engine: str, failure_threshold: int = 3, reset_timeout: float = 30.0
+    ):
+        self.engine = engine
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        # HALF_OPEN で試している合成を許可した時刻 (None なら試していない)
+        self._trial_at = None
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _trial_pending(self) -> bool:
+        # 結果が記録されないまま reset_timeout を過ぎた試行は諦めて次を通す
+        return (
+            self._trial_at is not None
+            and time.monotonic() - self._trial_at < self.reset_timeout
+        )
+
+    def available(self) -> bool:
+        """合成を試せる状態なら True (allow と違い、試行の枠は確保しない)"""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._trial_pending())
+
+    def allow(self) -> bool:
+        """
+        合成を1回試してよければ True．
+        HALF_OPEN では結果 (record_success / record_failure / release) が出るまで
+        1件だけ通す．
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN or self._trial_pending():
+            return False
+        self._trial_at = time.monotonic()
+        return True
+
+    def release(self):
+        """allow で許可した合成が結果を出さずに終わった (取り消しなど)"""
+        self._trial_at = None
+
+    @property
+    def retry_after(self) -> float:
+        """OPEN の場合、HALF_OPEN になるまでの秒数"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self._trial_at = None
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_at = None
+        state = self.state
+        if state == HALF_OPEN or (
+            state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.trip()
+
+    def trip(self):
+        """即座に OPEN にする (ヘルスチェックの失敗など)"""
+        self._opened_at = time.monotonic()
+        self._trial_at = None
+        if self._state != OPEN:
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        logger.warning(f"TTS engine {self.engine}: circuit {self._state} -> {state}")
+        self._state = state
+        metrics.inc("tts_circuit_transitions_total", engine=self.engine, state=state)
+
+
+class HealthMonitor:
+    """
+    エンジンの health_check を定期的に実行し、結果をサーキットブレーカーに反映する．
+    異常時は retry_interval の短い間隔で確認し、応答が戻りしだい CLOSED に戻す．
+    run は同期関数を実行するコルーチン関数 (合成と同じスレッドで実行するため)．
+    busy が True を返す間 (合成中) は、合成の結果がブレーカーに反映されるため
+    確認しない (合成待ちの後ろに並んだ確認がタイムアウトして OPEN にしないため)．
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        health_check,
+        breaker: CircuitBreaker,
+        run,
+        busy=None,
+        interval: float = 10.0,
+        retry_interval: float = 3.0,
+        timeout: float = 30.0,
+    ):
+        self.engine = engine
+        self.health_check = health_check
+        self.breaker = breaker
+        self.run = run
+        self.busy = busy or (lambda: False)
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def check(self) -> bool:
+        """ヘルスチェックを1回実行し、結果をブレーカーに反映して返す"""
+        try:
+            ok = bool(await asyncio.wait_for(self.run(self.health_check), self.timeout))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"TTS engine {self.engine}: health check error: {e}")
+            ok = False
+
+        metrics.inc(
+            "tts_health_checks_total",
+            engine=self.engine,
+            result="ok" if ok else "fail",
+        )
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.trip()
+        return ok
+
+    async def _loop(self):
+        while True:
+            healthy = self.breaker.state == CLOSED
+            await asyncio.sleep(self.interval if healthy else self.retry_interval)
+            if self.busy():
+                continue
+            await self.check()
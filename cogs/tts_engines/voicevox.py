@@ -1,8 +1,18 @@
 import requests
+import http.client
+import io
 import json
 import os
 import logging
-from .base import TTSProvider
+import socket
+import time
+import unicodedata
+import urllib.parse
+import zipfile
+import settings
+from .base import OutputFormat, TTSProvider
+from ..cancellation import SynthesisCancelled
+from ..lru import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,16 +22,32 @@ class VoicevoxProvider(TTSProvider):
     VOICEVOX EngineのHTTP APIラッパークラス．
     """
 
+    supports_batch = True
+
     def __init__(self):
         self.base_url = os.getenv("VOICEVOX_URL", "http://127.0.0.1:50021")
         # デフォルトスピーカーID (3: ずんだもん・ノーマル)
         self.current_speaker_id = int(os.getenv("VOICEVOX_SPEAKER_ID", "3"))
         self.speaker_map = {}
+        # (接続, 受信) のタイムアウト (秒)．エンジンが止まっているときに長く待たない
+        self.timeout = (3.05, getattr(settings, "VOICEVOX_TIMEOUT_SEC", 30.0))
+        # (正規化したテキスト, スピーカーID) -> AudioQuery
+        # 感情による違いはスカラー値だけなので、同じ文なら感情が違っても再利用できる
+        self.query_cache = LRUCache(
+            getattr(settings, "VOICEVOX_QUERY_CACHE_SIZE", 256), name="voicevox_query"
+        )
+        # エンジンを --enable_cancellable_synthesis で起動していれば、
+        # 取り消したときにエンジン側の合成も止める
+        self.synthesis_path = (
+            "/cancellable_synthesis"
+            if getattr(settings, "VOICEVOX_CANCELLABLE_SYNTHESIS", False)
+            else "/synthesis"
+        )
 
     def initialize(self):
         """スピーカー一覧を取得し，IDと名前のマッピングを作成する"""
         try:
-            resp = requests.get(f"{self.base_url}/speakers")
+            resp = requests.get(f"{self.base_url}/speakers", timeout=self.timeout)
             if resp.status_code == 200:
                 data = resp.json()
                 for chara in data:
@@ -38,68 +64,265 @@ class VoicevoxProvider(TTSProvider):
         except Exception as e:
             logger.error(f"VOICEVOX Connection Error: {e}")
 
-    def generate_audio(self, text: str, emotion: str, output_path: str):
-        """AudioQueryの作成と音声合成の2ステップを実行する"""
+    def generate_audio(
+        self, text: str, emotion: str, output_path: str, cancel_token=None
+    ):
+        """
+        AudioQueryの作成と音声合成の2ステップを実行する．
+        取り消しは各ステップの手前で確認し、合成の応答待ちの間に取り消されたら
+        接続を切ってすぐに戻る (_post_cancellable)．
+        """
         try:
-            # 1. Audio Queryの作成（イントネーション等のデータ生成）
-            params = {"text": text, "speaker": self.current_speaker_id}
-            query_resp = requests.post(f"{self.base_url}/audio_query", params=params)
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
 
-            if query_resp.status_code != 200:
-                logger.error(f"VOICEVOX Query Error: {query_resp.text}")
+            speaker_id = self.current_speaker_id
+
+            # 1. Audio Queryの作成（イントネーション等のデータ生成）
+            query_data = self._prepare_query(text, emotion, speaker_id)
+            if query_data is None:
                 return
 
-            query_data = query_resp.json()
-
-            # --- パラメータ調整 ---
-            # 感情タグに応じてピッチや抑揚を微調整する
-            pitch = 0.0
-            speed = 1.0
-            intonation = 1.0
-            volume = 1.0
-
-            if emotion == "JOY":
-                pitch = 0.02
-                intonation = 1.10
-                speed = 1.02
-            elif emotion == "SAD":
-                pitch = -0.02
-                intonation = 0.95
-                speed = 0.98
-            elif emotion == "ANGRY":
-                speed = 1.05
-                intonation = 1.10
-                pitch = -0.01
-                volume = 1.05
-            elif emotion == "SURPRISE":
-                pitch = 0.03
-                speed = 1.05
-                intonation = 1.10
-
-            # パラメータ適用
-            query_data["pitchScale"] = pitch
-            query_data["speedScale"] = speed
-            query_data["intonationScale"] = intonation
-            query_data["volumeScale"] = volume
+            # AudioQuery の間に取り消されていたら /synthesis は送らない
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
 
             # 2. 音声合成 (Synthesis)
-            headers = {"Content-Type": "application/json"}
-            synth_resp = requests.post(
-                f"{self.base_url}/synthesis",
-                headers=headers,
-                params={"speaker": self.current_speaker_id},
-                data=json.dumps(query_data),
+            status, body = self._post_cancellable(
+                self.synthesis_path, {"speaker": speaker_id}, query_data, cancel_token
             )
-
-            if synth_resp.status_code == 200:
+            if status == 200:
                 with open(output_path, "wb") as f:
-                    f.write(synth_resp.content)
+                    f.write(body)
             else:
-                logger.error(f"VOICEVOX Synthesis Error: {synth_resp.status_code}")
+                logger.error(f"VOICEVOX Synthesis Error: {status}")
 
+        except SynthesisCancelled:
+            raise
         except Exception as e:
             logger.error(f"VOICEVOX Generation Exception: {e}")
 
+    def _post_cancellable(self, path: str, params: dict, payload, cancel_token=None):
+        """
+        JSON を POST して (ステータス, 本文) を返す．
+        エンジンは合成を終えるまで応答を返さないため、取り消されたらソケットを切断して
+        応答待ちの途中でも SynthesisCancelled を送出する．
+        (requests では応答が返るまで接続に手が届かないので http.client を直接使う)
+        """
+        url = urllib.parse.urlsplit(self.base_url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        connect_timeout, read_timeout = self.timeout
+        conn = connection_class(url.hostname, url.port, timeout=connect_timeout)
+
+        def _abort():
+            if conn.sock is not None:
+                try:
+                    conn.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        remove_callback = None
+        try:
+            conn.connect()
+            conn.sock.settimeout(read_timeout)
+            # 既に取り消されていればその場で切断される
+            if cancel_token:
+                remove_callback = cancel_token.add_callback(_abort)
+            conn.request(
+                "POST",
+                f"{url.path.rstrip('/')}{path}?{urllib.parse.urlencode(params)}",
+                body=json.dumps(payload),
+                headers={"Content-Type": "application/json"},
+            )
+            resp = conn.getresponse()
+            body = io.BytesIO()
+            while chunk := resp.read(64 * 1024):
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                body.write(chunk)
+            return resp.status, body.getvalue()
+        except (OSError, http.client.HTTPException) as e:
+            # 切断したことによる通信エラーは取り消しとして扱う
+            if cancel_token and cancel_token.cancelled:
+                raise SynthesisCancelled() from e
+            raise
+        finally:
+            if remove_callback:
+                remove_callback()
+            conn.close()
+
+    def health_check(self) -> bool:
+        try:
+            resp = requests.get(f"{self.base_url}/version", timeout=2)
+            return resp.ok
+        except requests.RequestException:
+            return False
+
+    def warm_up(self):
+        """
+        現在のスタイルと VOICEVOX_WARMUP_SPEAKERS のモデルを
+        /initialize_speaker で読み込んでおく (読み込み済みなら何もしない)．
+        """
+        speaker_ids = [self.current_speaker_id]
+        for speaker_id in getattr(settings, "VOICEVOX_WARMUP_SPEAKERS", []):
+            if speaker_id not in speaker_ids:
+                speaker_ids.append(speaker_id)
+
+        for speaker_id in speaker_ids:
+            started = time.perf_counter()
+            try:
+                resp = requests.post(
+                    f"{self.base_url}/initialize_speaker",
+                    params={"speaker": speaker_id, "skip_reinit": "true"},
+                    timeout=self.timeout,
+                )
+                if resp.ok:
+                    logger.info(
+                        f"VOICEVOX speaker {speaker_id} initialized in"
+                        f" {(time.perf_counter() - started) * 1000:.0f}ms"
+                    )
+                else:
+                    logger.warning(
+                        f"VOICEVOX initialize_speaker failed: {speaker_id}"
+                        f" (Status {resp.status_code})"
+                    )
+            except Exception as e:
+                logger.warning(f"VOICEVOX initialize_speaker error: {e}")
+
+    def synthesize_batch(self, segments: list, cancel_token=None) -> list:
+        """
+        セグメントごとの AudioQuery (感情パラメータ適用済み) をまとめて
+        /multi_synthesis へ送り、返ってきた ZIP をメモリ上で展開する．
+        合成のための HTTP リクエストはセグメント数によらず1回になる．
+        """
+        results = [None] * len(segments)
+        try:
+            speaker_id = self.current_speaker_id
+
+            # 1. セグメントごとの Audio Query (キャッシュ済みなら通信しない)
+            indices = []
+            queries = []
+            for i, (text, emotion) in enumerate(segments):
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                query_data = self._prepare_query(text, emotion, speaker_id)
+                if query_data is not None:
+                    indices.append(i)
+                    queries.append(query_data)
+            if not queries:
+                return results
+
+            # AudioQuery の間に取り消されていたら /multi_synthesis は送らない
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+
+            # 2. まとめて音声合成 (結果は 001.wav, 002.wav ... を含む ZIP)
+            # 取り消されたら応答 (全セグメントの合成) を待たずに戻る
+            status, body = self._post_cancellable(
+                "/multi_synthesis", {"speaker": speaker_id}, queries, cancel_token
+            )
+            if status != 200:
+                logger.error(f"VOICEVOX Multi Synthesis Error: {status}")
+                return results
+
+            with zipfile.ZipFile(io.BytesIO(body)) as archive:
+                names = sorted(
+                    name for name in archive.namelist() if name.endswith(".wav")
+                )
+                for i, name in zip(indices, names):
+                    results[i] = archive.read(name)
+            return results
+
+        except SynthesisCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"VOICEVOX Multi Synthesis Exception: {e}")
+            return results
+
+    def _prepare_query(self, text: str, emotion: str, speaker_id: int) -> dict | None:
+        """感情パラメータと出力形式を適用した AudioQuery を返す"""
+        query_data = self._audio_query(text, speaker_id)
+        if query_data is None:
+            return None
+
+        self._apply_emotion(query_data, emotion)
+
+        # 合意した形式で出力させる
+        # (48kHz ステレオなら rust_core のリサンプルが不要になる)
+        if self.output_format:
+            query_data["outputSamplingRate"] = self.output_format.sample_rate
+            query_data["outputStereo"] = self.output_format.channels == 2
+        return query_data
+
+    def _audio_query(self, text: str, speaker_id: int) -> dict | None:
+        """
+        AudioQuery を取得する．同じ文・同じスピーカーならキャッシュを使う．
+        書き換えてもキャッシュに影響しないようコピーを返す．
+        """
+        key = (unicodedata.normalize("NFKC", text).strip(), speaker_id)
+        cached = self.query_cache.get(key)
+        if cached is None:
+            params = {"text": text, "speaker": speaker_id}
+            query_resp = requests.post(
+                f"{self.base_url}/audio_query", params=params, timeout=self.timeout
+            )
+
+            if query_resp.status_code != 200:
+                logger.error(f"VOICEVOX Query Error: {query_resp.text}")
+                return None
+
+            cached = query_resp.json()
+            self.query_cache.put(key, cached)
+
+        # 書き換えるのは最上位のスカラー値だけなので浅いコピーで足りる
+        return dict(cached)
+
+    @staticmethod
+    def _apply_emotion(query_data: dict, emotion: str):
+        """感情タグに応じてピッチや抑揚を微調整する"""
+        pitch = 0.0
+        speed = 1.0
+        intonation = 1.0
+        volume = 1.0
+
+        if emotion == "JOY":
+            pitch = 0.02
+            intonation = 1.10
+            speed = 1.02
+        elif emotion == "SAD":
+            pitch = -0.02
+            intonation = 0.95
+            speed = 0.98
+        elif emotion == "ANGRY":
+            speed = 1.05
+            intonation = 1.10
+            pitch = -0.01
+            volume = 1.05
+        elif emotion == "SURPRISE":
+            pitch = 0.03
+            speed = 1.05
+            intonation = 1.10
+
+        # パラメータ適用
+        query_data["pitchScale"] = pitch
+        query_data["speedScale"] = speed
+        query_data["intonationScale"] = intonation
+        query_data["volumeScale"] = volume
+
+    def negotiate_output_format(self, preferred: OutputFormat) -> OutputFormat | None:
+        # AudioQuery の outputSamplingRate / outputStereo で任意の形式を指定できる
+        if preferred.channels not in (1, 2):
+            return None
+        self.output_format = preferred
+        return preferred
+
+    def current_voice(self) -> str | None:
+        return str(self.current_speaker_id)
+
     def get_presets(self) -> list[str]:
         return list(self.speaker_map.keys())
 
@@ -1,9 +1,15 @@
 from .consts import load_json, save_json, extract_emotion
+from .scheduler import Scheduler
+from .schedule_store import ScheduleStore
+from .speech_queue import PRIORITY_ALARM, PRIORITY_REPLY
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
+import asyncio
 import random
 import logging
+import os
+import uuid
 from datetime import datetime, timedelta
 import settings
 
@@ -14,30 +20,132 @@ logger = logging.getLogger(__name__)
 class Utilities(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.alarm_list = load_json("alarms.json", [])
+        self.alarm_list = []
         self.timer_list = []
 
         self.config = load_json("config.json", {})
         self.default_alarm_channel_id = int(self.config.get("alarmChannelId", 0))
 
-        self.last_checked_minute = ""
+        # アラーム・タイマーは次の発火時刻のヒープで管理する (ポーリングしない)
+        self.scheduler = Scheduler()
+        # アラーム/タイマーのID -> ScheduleHandle
+        self._handles = {}
 
-        self.check_alarm_task.start()
-        self.check_timer_task.start()
+        # アラーム・タイマーは SQLite に1件ずつ差分保存する
+        self.store = ScheduleStore(getattr(settings, "SCHEDULE_DB_PATH", "schedule.db"))
+        self.catchup_grace = timedelta(
+            seconds=getattr(settings, "SCHEDULE_CATCHUP_GRACE_SEC", 6 * 60 * 60)
+        )
 
-    def cog_unload(self):
-        self.check_alarm_task.cancel()
-        self.check_timer_task.cancel()
+        # 同時刻に発火したアラーム・タイマーの一括通知
+        self._due = []
+        self._fanout_scheduled = False
+        self._fanout_tasks = set()
+        self.fanout_concurrency = getattr(settings, "NOTIFY_FANOUT_CONCURRENCY", 5)
+        self.fanout_timeout = getattr(settings, "NOTIFY_FANOUT_TIMEOUT_SEC", 30)
+        self.notify_retry = timedelta(seconds=getattr(settings, "NOTIFY_RETRY_SEC", 60))
+        # 再送待ちのアラーム/タイマーのID (音声は初回だけ再生する)
+        self._retrying = set()
+        self._start_task = None
+
+    async def cog_load(self):
+        alarms, timers = await self.store.load()
+
+        # 旧形式 (alarms.json) からの移行
+        migrating = not alarms and os.path.exists("alarms.json")
+        if migrating:
+            for alarm in load_json("alarms.json", []):
+                alarm["id"] = uuid.uuid4().hex
+                alarms.append((alarm, None))
+
+        # 停止中に期限を過ぎたものは保存済みの時刻のまま登録し、起動直後に発火させる
+        unsaved = []
+        for alarm, next_fire in alarms:
+            self.alarm_list.append(alarm)
+            when = self._schedule_alarm(alarm, next_fire)
+            if next_fire is None:
+                unsaved.append((alarm, when))
+        saved = not unsaved or await self.store.save_alarms(unsaved)
+
+        # 移行元のファイルは保存できたことを確かめてから退避する
+        if migrating:
+            if saved:
+                os.replace("alarms.json", "alarms.json.migrated")
+                logger.info(f"Migrated {len(alarms)} alarms from alarms.json")
+            else:
+                logger.error(
+                    "Failed to save alarms migrated from alarms.json; "
+                    "keeping the file to retry on the next start"
+                )
+        for timer in timers:
+            self.timer_list.append(timer)
+            self._schedule_timer(timer)
+
+        # 停止中に期限を過ぎたものは接続完了後に通知する
+        # (それまではチャンネルを取得できない)
+        self._start_task = asyncio.create_task(self._start_scheduler())
+        logger.info(f"Restored {len(alarms)} alarms and {len(timers)} timers.")
+
+    async def _start_scheduler(self):
+        await self.bot.wait_until_ready()
+        self.scheduler.start()
+
+    async def cog_unload(self):
+        self.scheduler.stop()
+        tasks = list(self._fanout_tasks)
+        if self._start_task:
+            tasks.append(self._start_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # 未完了の書き込みを待つ間もイベントループを止めない
+        await asyncio.to_thread(self.store.close)
+
+    @staticmethod
+    def _next_alarm_time(time_str, now=None):
+        """ "HH:MM" 形式の時刻が次に訪れる日時を返す"""
+        now = now or datetime.now()
+        hour, minute = map(int, time_str.split(":"))
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target
+
+    def _schedule_alarm(self, alarm, when=None):
+        """アラームを登録し、次の発火日時を返す"""
+        when = when or self._next_alarm_time(alarm["time"])
+        self._handles[alarm["id"]] = self.scheduler.call_at(
+            when, self._on_due, "alarm", alarm, when
+        )
+        return when
 
-    def save_alarms(self):
-        save_json("alarms.json", self.alarm_list)
+    def _schedule_timer(self, timer):
+        self._handles[timer["id"]] = self.scheduler.call_at(
+            timer["end_time"], self._on_due, "timer", timer, timer["end_time"]
+        )
 
-    def speak(self, guild, text):
+    def _is_stale(self, when, kind):
+        """停止中に過ぎてから猶予以上経ったものは通知しない"""
+        late = datetime.now() - when
+        if late > self.catchup_grace:
+            logger.info(f"Skipping {kind} missed by {late} (downtime).")
+            return True
+        return False
+
+    def _cancel_schedule(self, item):
+        self._retrying.discard(item.get("id"))
+        handle = self._handles.pop(item.get("id"), None)
+        if handle:
+            handle.cancel()
+
+    def speak(self, guild, text, priority=PRIORITY_REPLY):
         audio_cog = self.bot.get_cog("AudioSystem")
         if audio_cog and guild and guild.voice_client:
             # 共通関数を使用
             clean_text, emotion = extract_emotion(text)
-            audio_cog.enqueue_speech(guild.voice_client, clean_text, emotion)
+            audio_cog.enqueue_speech(
+                guild.voice_client, clean_text, emotion, priority=priority
+            )
 
     def get_random_text(self, key, **kwargs):
         raw_val = settings.RESPONSES.get(key, "メッセージが見つかりません")
@@ -75,6 +183,7 @@ class Utilities(commands.Cog):
             return
 
         new_alarm = {
+            "id": uuid.uuid4().hex,
             "time": formatted_time,
             "message": message,
             "user_id": interaction.user.id,
@@ -82,7 +191,8 @@ class Utilities(commands.Cog):
             "repeat": repeat,
         }
         self.alarm_list.append(new_alarm)
-        self.save_alarms()
+        next_fire = self._schedule_alarm(new_alarm)
+        await self.store.save_alarm(new_alarm, next_fire)
 
         icon = "🔄" if repeat else "1️⃣"
 
@@ -127,7 +237,8 @@ class Utilities(commands.Cog):
     async def alarm_delete(self, interaction: discord.Interaction, index: int):
         if 1 <= index <= len(self.alarm_list):
             removed = self.alarm_list.pop(index - 1)
-            self.save_alarms()
+            self._cancel_schedule(removed)
+            await self.store.delete_alarm(removed["id"])
 
             raw_text = self.get_random_text(
                 "alarm_delete_text", time=removed["time"], message=removed["message"]
@@ -222,14 +333,16 @@ class Utilities(commands.Cog):
             return
 
         end_time = datetime.now() + timedelta(minutes=minutes)
-        self.timer_list.append(
-            {
-                "end_time": end_time,
-                "minutes": minutes,
-                "user_id": interaction.user.id,
-                "channel_id": interaction.channel_id,
-            }
-        )
+        new_timer = {
+            "id": uuid.uuid4().hex,
+            "end_time": end_time,
+            "minutes": minutes,
+            "user_id": interaction.user.id,
+            "channel_id": interaction.channel_id,
+        }
+        self.timer_list.append(new_timer)
+        self._schedule_timer(new_timer)
+        await self.store.save_timer(new_timer)
 
         raw_text = self.get_random_text("timer_set_text", minutes=minutes)
         clean_text, _ = extract_emotion(raw_text)
@@ -271,6 +384,8 @@ class Utilities(commands.Cog):
     async def timer_delete(self, interaction: discord.Interaction, index: int):
         if 1 <= index <= len(self.timer_list):
             removed = self.timer_list.pop(index - 1)
+            self._cancel_schedule(removed)
+            await self.store.delete_timer(removed["id"])
 
             raw_text = self.get_random_text(
                 "timer_delete_text", minutes=removed["minutes"]
@@ -354,75 +469,150 @@ class Utilities(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"計算式のエラーです: {e}", ephemeral=True)
 
-    # --- 定期タスク ---
-    @tasks.loop(seconds=10)
-    async def check_alarm_task(self):
-        now_str = datetime.now().strftime("%H:%M")
-
-        if self.last_checked_minute == now_str:
-            return
-
-        self.last_checked_minute = now_str
-        remove_list = []
-
-        for alarm in self.alarm_list:
-            if alarm["time"] == now_str:
-                target_channel_id = (
-                    alarm.get("channel_id") or self.default_alarm_channel_id
-                )
-
-                channel = self.bot.get_channel(target_channel_id)
-                if channel:
-                    notify_text_raw = self.get_random_text(
-                        "alarm_notify_text",
-                        user_id=alarm["user_id"],
-                        message=alarm["message"],
-                    )
-                    notify_text_clean, _ = extract_emotion(notify_text_raw)
-
-                    notify_voice = self.get_random_text(
-                        "alarm_notify_voice", message=alarm["message"]
-                    )
+    # --- スケジュール発火 ---
+    def _on_due(self, kind, item, when):
+        """
+        スケジューラから呼ばれる．同じタイミングで期限を迎えたものは
+        1つのタスクでまとめて通知する．
+        保存済みの行は通知を送り終えてから削除・再登録する．
+        """
+        self._handles.pop(item["id"], None)
+        self._due.append((kind, item, when))
+        if not self._fanout_scheduled:
+            self._fanout_scheduled = True
+            task = asyncio.get_running_loop().create_task(self._fanout())
+            self._fanout_tasks.add(task)
+            task.add_done_callback(self._fanout_tasks.discard)
+
+    async def _finish_alarm(self, alarm):
+        # 繰り返しアラームは次の同時刻に再登録する (停止中に何日過ぎても1回分)
+        if alarm["repeat"]:
+            next_fire = self._schedule_alarm(alarm)
+            await self.store.save_alarm(alarm, next_fire)
+        else:
+            if alarm in self.alarm_list:
+                self.alarm_list.remove(alarm)
+            await self.store.delete_alarm(alarm["id"])
+
+    async def _finish_timer(self, timer):
+        if timer in self.timer_list:
+            self.timer_list.remove(timer)
+        await self.store.delete_timer(timer["id"])
+
+    async def _finish(self, kind, item):
+        self._retrying.discard(item["id"])
+        if kind == "alarm":
+            await self._finish_alarm(item)
+        else:
+            await self._finish_timer(item)
 
-                    await channel.send(notify_text_clean)
-                    self.speak(channel.guild, notify_voice)
+    def _retry(self, kind, item, when):
+        """送信できなかった通知を後で送り直す (元の時刻のまま．猶予を過ぎたら諦める)"""
+        self._retrying.add(item["id"])
+        self._handles[item["id"]] = self.scheduler.call_at(
+            datetime.now() + self.notify_retry, self._on_due, kind, item, when
+        )
 
-                if not alarm["repeat"]:
-                    remove_list.append(alarm)
+    async def _fanout(self):
+        self._fanout_scheduled = False
+        batch, self._due = self._due, []
 
-        if remove_list:
-            for r in remove_list:
-                if r in self.alarm_list:
-                    self.alarm_list.remove(r)
-            self.save_alarms()
+        writes = []
+        messages = {}  # channel -> [通知テキスト]
+        targets = {}  # channel -> [(kind, item, when)]
+        voices = {}  # (guild_id, 音声キー) -> (guild, 音声テキスト)
 
-    @tasks.loop(seconds=1)
-    async def check_timer_task(self):
-        now = datetime.now()
-        remove_list = []
-
-        for timer in self.timer_list:
-            if now >= timer["end_time"]:
-                channel = self.bot.get_channel(timer["channel_id"])
-                if channel:
-                    notify_text_raw = self.get_random_text(
-                        "timer_notify_text",
-                        minutes=timer["minutes"],
-                        user_id=timer["user_id"],
-                    )
-                    notify_text_clean, _ = extract_emotion(notify_text_raw)
-
-                    notify_voice = self.get_random_text(
-                        "timer_notify_voice", minutes=timer["minutes"]
-                    )
+        for kind, item, when in batch:
+            if kind == "alarm":
+                channel_id = item.get("channel_id") or self.default_alarm_channel_id
+                text_kwargs = {"user_id": item["user_id"], "message": item["message"]}
+                voice_kwargs = {"message": item["message"]}
+            else:
+                channel_id = item["channel_id"]
+                text_kwargs = {"minutes": item["minutes"], "user_id": item["user_id"]}
+                voice_kwargs = {"minutes": item["minutes"]}
+
+            if self._is_stale(when, kind):
+                writes.append(self._finish(kind, item))
+                continue
+            channel = self.bot.get_channel(channel_id)
+            if not channel:
+                # 接続後に見つからないチャンネルには今後も送れない
+                logger.warning(f"Channel {channel_id} not found, dropping {kind}.")
+                writes.append(self._finish(kind, item))
+                continue
+
+            notify_text_raw = self.get_random_text(f"{kind}_notify_text", **text_kwargs)
+            notify_text_clean, _ = extract_emotion(notify_text_raw)
+            messages.setdefault(channel, []).append(notify_text_clean)
+            targets.setdefault(channel, []).append((kind, item, when))
+
+            # 同じギルドで同じ内容の音声は1回だけ合成・再生する (再送時は再生しない)
+            voice_key = (channel.guild.id, kind, tuple(voice_kwargs.items()))
+            if item["id"] not in self._retrying and voice_key not in voices:
+                notify_voice = self.get_random_text(
+                    f"{kind}_notify_voice", **voice_kwargs
+                )
+                voices[voice_key] = (channel.guild, notify_voice)
 
-                    await channel.send(notify_text_clean)
-                    self.speak(channel.guild, notify_voice)
-                remove_list.append(timer)
+        # 音声は送信の遅延に引きずられないよう先にキューへ入れる
+        for guild, notify_voice in voices.values():
+            self.speak(guild, notify_voice, priority=PRIORITY_ALARM)
 
-        for r in remove_list:
-            if r in self.timer_list:
-                self.timer_list.remove(r)
+        delivered = await self._send_bulk(messages)
+        for channel, items in targets.items():
+            for kind, item, when in items:
+                if channel in delivered:
+                    writes.append(self._finish(kind, item))
+                else:
+                    self._retry(kind, item, when)
+        await asyncio.gather(*writes)
+
+    @staticmethod
+    def _chunk_messages(texts, limit=2000):
+        """複数の通知を Discord の文字数上限に収まるようにまとめる"""
+        chunk = ""
+        for text in texts:
+            if chunk and len(chunk) + 1 + len(text) > limit:
+                yield chunk
+                chunk = ""
+            chunk = f"{chunk}\n{text}" if chunk else text[:limit]
+        if chunk:
+            yield chunk
+
+    async def _send_bulk(self, messages):
+        """
+        チャンネルごとにまとめた通知を並行して送信し、送り終えたチャンネルの集合を返す．
+        同時送信数を絞ってレート制限を避け、全体の所要時間に上限を設ける．
+        """
+        if not messages:
+            return set()
+
+        semaphore = asyncio.Semaphore(self.fanout_concurrency)
+
+        async def send(channel, texts):
+            async with semaphore:
+                for chunk in self._chunk_messages(texts):
+                    try:
+                        await channel.send(chunk)
+                    except Exception as e:
+                        # 1つのチャンネルの失敗で他の通知を止めない (失敗分は再送する)
+                        logger.error(f"Failed to notify channel {channel.id}: {e}")
+                        return False
+            return True
+
+        tasks = {
+            asyncio.create_task(send(channel, texts)): channel
+            for channel, texts in messages.items()
+        }
+        done, pending = await asyncio.wait(tasks, timeout=self.fanout_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(
+                f"Notification fan-out timed out: {len(pending)} channels will retry."
+            )
+        return {tasks[task] for task in done if task.result()}
 
 
 async def setup(bot):
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceEventCoalescer:
+    """
+    ボイスチャンネルの状態変化をギルドごとに一定時間まとめてから読み上げる．
+    - 時間内に元へ戻ったトグル (ミュート→解除など) は読み上げない
+    - 同時に入室した複数人への挨拶は1回にまとめる
+    - 時間内に退室した人への挨拶は取り消す
+    """
+
+    def __init__(self, window: float, emit):
+        # emit(guild_id, [レスポンスキー, ...]) がまとめた結果を受け取る
+        self.window = window
+        self._emit = emit
+        self._pending = {}
+
+    def _bucket(self, guild_id):
+        bucket = self._pending.get(guild_id)
+        if bucket is None:
+            # 最初のイベントから一定時間後にまとめて確定する (固定窓)
+            handle = asyncio.get_running_loop().call_later(
+                self.window, self._flush, guild_id
+            )
+            bucket = {"toggles": {}, "joins": [], "handle": handle}
+            self._pending[guild_id] = bucket
+        return bucket
+
+    def record_join(self, guild_id, member_id):
+        metrics.inc("voice_events_received_total", kind="join")
+        joins = self._bucket(guild_id)["joins"]
+        if member_id not in joins:
+            joins.append(member_id)
+
+    def record_leave(self, guild_id, member_id):
+        bucket = self._pending.get(guild_id)
+        if bucket and member_id in bucket["joins"]:
+            bucket["joins"].remove(member_id)
+            metrics.inc("voice_events_coalesced_total", kind="join")
+
+    def record_toggle(self, guild_id, member_id, key_start, key_end, before, after):
+        metrics.inc("voice_events_received_total", kind=key_start)
+        toggles = self._bucket(guild_id)["toggles"]
+        state = toggles.get((member_id, key_start))
+        if state is None:
+            toggles[(member_id, key_start)] = [before, after, key_end]
+        else:
+            # 窓の最初の状態は保持し、最新の状態だけ更新する
+            state[1] = after
+            metrics.inc("voice_events_coalesced_total", kind=key_start)
+
+    def _flush(self, guild_id):
+        bucket = self._pending.pop(guild_id, None)
+        if not bucket:
+            return
+
+        keys = []
+        joins = bucket["joins"]
+        if joins:
+            keys.append("join_greet_normal")
+            if len(joins) > 1:
+                metrics.inc("voice_events_coalesced_total", len(joins) - 1, kind="join")
+
+        for (_, key_start), (initial, final, key_end) in bucket["toggles"].items():
+            if initial == final:
+                # 元に戻っているので読み上げる必要がない
+                metrics.inc("voice_events_coalesced_total", kind=key_start)
+                continue
+            key = key_start if final else key_end
+            if key in keys:
+                # 複数人の同じ変化は1回だけ読み上げる
+                metrics.inc("voice_events_coalesced_total", kind=key_start)
+                continue
+            keys.append(key)
+
+        if keys:
+            metrics.inc("voice_events_emitted_total", len(keys))
+            try:
+                self._emit(guild_id, keys)
+            except Exception as e:
+                logger.error(f"Failed to emit voice events: {e}")
+
+    def cancel(self, guild_id):
+        """切断時などに未確定のイベントを捨てる"""
+        bucket = self._pending.pop(guild_id, None)
+        if bucket:
+            bucket["handle"].cancel()
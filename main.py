@@ -8,12 +8,14 @@ import pathlib
 import time
 import subprocess
 import json
+import hashlib
 from dotenv import load_dotenv
 
 # 設定ファイルの読み込み
 load_dotenv()
 import settings  # noqa: E402
-from cogs.tts_engines import get_tts_provider  # noqa: E402
+from cogs.consts import load_json, save_json  # noqa: E402
+from cogs.tts_engines import available_engines, get_tts_provider  # noqa: E402
 
 # ログ設定
 logging.basicConfig(
@@ -138,24 +140,72 @@ def try_launch_app(engine_name):
             print("! 自動起動に失敗しました。手動でアプリを起動してください。")
 
 
-def wait_for_launch(provider, max_retries=60):
-    print("エンジンの起動を確認中", end="", flush=True)
+async def probe_engine(provider, max_retries=60):
+    """
+    エンジンが応答するまで initialize を繰り返し、プリセット一覧を返す。
+    initialize は同期処理のため別スレッドで実行し、イベントループを止めない。
+    """
     for _ in range(max_retries):
         try:
-            provider.initialize()
-            presets = provider.get_presets()
+            await asyncio.to_thread(provider.initialize)
+            presets = await asyncio.to_thread(provider.get_presets)
             if presets:
-                print(" 完了！")
                 return presets
         except Exception:
             pass
-        time.sleep(1)
-        print(".", end="", flush=True)
+        await asyncio.sleep(1)
 
-    print("\nタイムアウト: エンジンの起動が確認できませんでした。")
+    logger.error("タイムアウト: エンジンの起動が確認できませんでした。")
     return []
 
 
+def command_tree_hash(tree, guild=None):
+    """
+    コマンドツリーの定義 (名前・説明・引数など Discord に送る内容) から
+    安定したハッシュを計算する。
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda c: (c.get("type", 1), c["name"]),
+    )
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class StartupTimer:
+    """起動処理の各段階の所要時間を記録し、まとめてログに出す"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = {}
+        self._running = {}
+
+    def start(self, phase):
+        self._running[phase] = time.perf_counter()
+
+    def stop(self, phase):
+        """計測中の段階を終了する。計測中でなければ False を返す"""
+        started = self._running.pop(phase, None)
+        if started is None:
+            return False
+        self.phases[phase] = time.perf_counter() - started
+        return True
+
+    async def track(self, phase, aw):
+        self.start(phase)
+        try:
+            return await aw
+        finally:
+            self.stop(phase)
+
+    def report(self):
+        breakdown = " ".join(
+            f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in self.phases.items()
+        )
+        total = time.perf_counter() - self.started_at
+        logger.info(f"Startup timing: {breakdown} (total {total * 1000:.0f}ms)")
+
+
 def load_character_config(char_dir: pathlib.Path):
     """
     指定されたキャラクターフォルダ内の設定ファイルを読み込む。
@@ -202,25 +252,73 @@ def load_character_config(char_dir: pathlib.Path):
 
 
 class TTSBot(commands.Bot):
-    def __init__(self):
+    def __init__(self, tts_provider=None, engine_probe=None, startup_timer=None):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.voice_states = True
         prefix = getattr(settings, "COMMAND_PREFIX", "!")
         super().__init__(command_prefix=prefix, intents=intents, help_command=None)
+        # 起動処理で作成したエンジン (AudioSystem が共有して使う)
+        self.tts_provider = tts_provider
+        # エンジンの起動確認タスク (ログインと並行して進む)
+        self.engine_probe = engine_probe
+        self.startup_timer = startup_timer or StartupTimer()
+        self.command_sync_task = None
 
     async def setup_hook(self):
-        initial_extensions = ["cogs.audio", "cogs.chat", "cogs.utils"]
-        for extension in initial_extensions:
-            try:
-                await self.load_extension(extension)
-                logger.info(f"Loaded extension: {extension} ......成功")
-            except Exception as e:
-                logger.error(f"Failed to load extension {extension}: {e}")
+        # setup_hook は HTTP ログインの直後に呼ばれる
+        self.startup_timer.stop("login")
+        self.startup_timer.start("gateway")
+
+        initial_extensions = ["cogs.audio", "cogs.chat", "cogs.utils", "cogs.stats"]
+        await self.startup_timer.track(
+            "extensions",
+            asyncio.gather(*(self._load_extension(ext) for ext in initial_extensions)),
+        )
 
+        # コマンドの同期はゲートウェイ接続と並行して行う
+        self.command_sync_task = asyncio.create_task(
+            self.startup_timer.track("command_sync", self._sync_commands())
+        )
+
+    async def _load_extension(self, extension):
         try:
-            await self.tree.sync()
-            logger.info("Synced commands (Global) ......成功")
+            await self.load_extension(extension)
+            logger.info(f"Loaded extension: {extension} ......成功")
+        except Exception as e:
+            logger.error(f"Failed to load extension {extension}: {e}")
+
+    async def _sync_commands(self):
+        """
+        コマンド定義が前回の同期から変わったときだけ同期する (COMMAND_SYNC)。
+        グローバル同期はレート制限が厳しく時間もかかるため、再起動のたびには行わない。
+        DEV_GUILD_ID を指定した場合はそのギルドにだけ同期する。
+        """
+        mode = getattr(settings, "COMMAND_SYNC", "auto")
+        if mode == "never":
+            logger.info("Command sync skipped (COMMAND_SYNC=never)")
+            return
+
+        dev_guild_id = getattr(settings, "DEV_GUILD_ID", None)
+        guild = discord.Object(id=dev_guild_id) if dev_guild_id else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+        label = f"Guild {dev_guild_id}" if guild else "Global"
+
+        # アプリケーションと同期先ごとに前回のハッシュを保存する
+        state_path = getattr(settings, "COMMAND_SYNC_STATE_PATH", "command_sync.json")
+        scope = f"{self.application_id}:{dev_guild_id or 'global'}"
+        digest = command_tree_hash(self.tree, guild)
+        state = load_json(state_path, {})
+        if mode != "always" and state.get(scope) == digest:
+            logger.info(f"Commands unchanged, sync skipped ({label})")
+            return
+
+        try:
+            await self.tree.sync(guild=guild)
+            state[scope] = digest
+            save_json(state_path, state)
+            logger.info(f"Synced commands ({label}) ......成功")
         except Exception as e:
             logger.error(f"Failed to sync commands: {e}")
 
@@ -229,9 +327,23 @@ class TTSBot(commands.Bot):
         logger.info(f"Engine: {settings.TTS_ENGINE}")
         logger.info(f"Character: {settings.STARTUP_CHARACTER}")
         logger.info("System Ready.")
+        # 再接続時の on_ready では出力しない
+        if self.startup_timer.stop("gateway"):
+            asyncio.create_task(self._report_startup())
         if not self.change_status_loop.is_running():
             self.change_status_loop.start()
 
+    async def _report_startup(self):
+        """並行して進めた起動処理がすべて終わってから所要時間を出力する"""
+        pending = [
+            task
+            for task in (self.engine_probe, self.command_sync_task)
+            if task is not None
+        ]
+        if pending:
+            await asyncio.wait(pending)
+        self.startup_timer.report()
+
     @tasks.loop(minutes=10)
     async def change_status_loop(self):
         status_list = getattr(settings, "STATUS_MESSAGES", ["Running..."])
@@ -244,71 +356,109 @@ class TTSBot(commands.Bot):
         await self.wait_until_ready()
 
 
-async def main():
-    print("=== 起動設定ウィザード ===")
+def select_engine_interactive():
+    # 表示名 -> エンジン名
+    engines = {label: name for name, label in available_engines().items()}
+    selected_engine = input_index(
+        "使用するTTSエンジンを選択してください:", list(engines)
+    )
+    return engines[selected_engine]
 
-    # 1. TTSエンジンの選択
-    engines = ["A.I.VOICE", "VOICEVOX"]
-    selected_engine = input_index("使用するTTSエンジンを選択してください:", engines)
 
-    if selected_engine == "A.I.VOICE":
-        settings.TTS_ENGINE = "aivoice"
-    elif selected_engine == "VOICEVOX":
-        settings.TTS_ENGINE = "voicevox"
-    else:
-        settings.TTS_ENGINE = "aivoice"
+def select_profile_interactive():
+    """
+    人格設定 (charactersフォルダ) を選択させ、フォルダ名を返す。
+    LLMを使用しない場合やフォルダがない場合は None。
+    """
+    char_base_dir = pathlib.Path("characters")
+    char_dirs = []
 
-    print(f"-> エンジン: {settings.TTS_ENGINE} を選択しました。")
+    if char_base_dir.exists():
+        char_dirs = [d for d in char_base_dir.iterdir() if d.is_dir()]
 
-    try_launch_app(settings.TTS_ENGINE)
+    if not char_dirs:
+        print(
+            "\n※ charactersフォルダにキャラクター設定が見つかりません。LLM機能はオフで起動します。"
+        )
+        return None
 
-    # 2. キャラクター選択 (TTS)
-    engine_name = settings.TTS_ENGINE
-    temp_provider = get_tts_provider(engine_name)
-    presets = wait_for_launch(temp_provider)
+    # フォルダ名でソート
+    char_names = sorted([d.name for d in char_dirs])
 
-    if presets:
-        char_choice = select_character_interactive(presets)
-        if char_choice:
-            settings.STARTUP_CHARACTER = char_choice
-            print(f"-> キャラクター: {char_choice} を選択しました。")
-    else:
-        print("! プリセットが見つかりませんでした。")
+    return input_index(
+        "使用する人格設定(characters)を選択してください:",
+        char_names,
+        zero_label="LLMを使用しない (No Use)",
+    )
 
-    # 3. 人格設定 (charactersフォルダ) 選択
-    char_base_dir = pathlib.Path("characters")
-    char_dirs = []
 
-    if char_base_dir.exists():
-        char_dirs = [d for d in char_base_dir.iterdir() if d.is_dir()]
+def apply_profile(profile_name):
+    """人格設定を読み込む (None ならLLMを使用しない)"""
+    if not profile_name:
+        settings.SYSTEM_PROMPT = None
+        return
 
-    if char_dirs:
-        # フォルダ名でソート
-        char_names = sorted([d.name for d in char_dirs])
+    target_dir = pathlib.Path("characters") / profile_name
+    if not target_dir.is_dir():
+        logger.error(f"人格設定が見つかりません: {target_dir}")
+        settings.SYSTEM_PROMPT = None
+        return
+
+    print(f"-> 設定フォルダ: {profile_name} を読み込みます...")
+    if load_character_config(target_dir):
+        print("-> 完了しました。")
+    else:
+        print("-> 注意: プロンプトファイルが見つかりませんでした。")
 
-        selected_char_name = input_index(
-            "使用する人格設定(characters)を選択してください:",
-            char_names,
-            zero_label="LLMを使用しない (No Use)",
-        )
 
-        if selected_char_name:
-            target_dir = char_base_dir / selected_char_name
-            print(f"-> 設定フォルダ: {selected_char_name} を読み込みます...")
+async def main():
+    timer = StartupTimer()
+    headless = getattr(settings, "HEADLESS", False)
 
-            if load_character_config(target_dir):
-                print("-> 完了しました。")
-            else:
-                print("-> 注意: プロンプトファイルが見つかりませんでした。")
+    # 1. TTSエンジンの選択
+    if headless:
+        settings.TTS_ENGINE = settings.TTS_ENGINE.lower()
+        if settings.TTS_ENGINE not in available_engines():
+            logger.warning(f"Unknown TTS engine: {settings.TTS_ENGINE}")
+            settings.TTS_ENGINE = "aivoice"
+        logger.info(f"Headless mode: engine={settings.TTS_ENGINE}")
     else:
-        print(
-            "\n※ charactersフォルダにキャラクター設定が見つかりません。LLM機能はオフで起動します。"
-        )
-        settings.SYSTEM_PROMPT = None
+        print("=== 起動設定ウィザード ===")
+        settings.TTS_ENGINE = select_engine_interactive()
+        print(f"-> エンジン: {settings.TTS_ENGINE} を選択しました。")
+
+    # 2. エンジンの起動と起動確認 (以降の設定・ログインと並行して進める)
+    fallback_engine = getattr(settings, "TTS_FALLBACK_ENGINE", "")
+    try_launch_app(settings.TTS_ENGINE)
+    if fallback_engine and fallback_engine != settings.TTS_ENGINE:
+        try_launch_app(fallback_engine)
+    provider = get_tts_provider(settings.TTS_ENGINE, fallback_engine)
+    engine_probe = asyncio.create_task(timer.track("engine", probe_engine(provider)))
+
+    # 3. 人格設定 (charactersフォルダ) 選択
+    if headless:
+        apply_profile(getattr(settings, "CHARACTER_PROFILE", ""))
+    else:
+        # 入力待ちの間もエンジンの起動確認を進めるため別スレッドで尋ねる
+        apply_profile(await asyncio.to_thread(select_profile_interactive))
+
+        # 4. キャラクター選択 (TTS)。プリセット一覧が必要なため起動確認を待つ
+        if not engine_probe.done():
+            print("\nエンジンの起動を確認中...")
+        presets = await engine_probe
+
+        if presets:
+            char_choice = select_character_interactive(presets)
+            if char_choice:
+                settings.STARTUP_CHARACTER = char_choice
+                print(f"-> キャラクター: {char_choice} を選択しました。")
+        else:
+            print("! プリセットが見つかりませんでした。")
 
-    # Bot起動
+    # Bot起動 (非対話モードではエンジンの起動確認と並行してログインする)
     print("\nBotを起動しています...")
-    async with TTSBot() as bot:
+    async with TTSBot(provider, engine_probe, timer) as bot:
+        timer.start("login")
         await bot.start(TOKEN)
 
 
@@ -0,0 +1,173 @@
+//! DSP 各段とパイプライン全体のベンチマーク
+//!
+//! 実行: `cargo bench` (rust_core/ で)
+//! 特定の段だけ: `cargo bench -- resample`
+
+use criterion::{BatchSize, BenchmarkId, Criterion, Throughput, criterion_group, criterion_main};
+use hound::{SampleFormat, WavSpec, WavWriter};
+use rust_core::dsp::{self, PipelineParams};
+use std::hint::black_box;
+use std::io::Cursor;
+
+const SAMPLE_RATES: [u32; 4] = [22050, 24000, 44100, 48000];
+const CHANNELS: [u16; 2] = [1, 2];
+// (名前, 長さ[秒]) 短い返答と長い読み上げ
+const DURATIONS: [(&str, f32); 2] = [("short", 1.0), ("long", 10.0)];
+
+// cogs/dsp.py と同じ設定値
+const PARAMS: PipelineParams = PipelineParams {
+    gain_db: 3.0,
+    silence_threshold: 100,
+    reverb_enabled: true,
+    reverb_delay_ms: 50,
+    reverb_decay: 0.3,
+    reverb_mix: 0.15,
+};
+
+struct Case {
+    name: String,
+    wav: Vec<u8>,
+    audio: dsp::Audio,
+}
+
+/// 前後に100msの無音を付けた 440Hz の正弦波 (16bit)
+fn make_wav(sample_rate: u32, channels: u16, seconds: f32) -> Vec<u8> {
+    let spec = WavSpec {
+        channels,
+        sample_rate,
+        bits_per_sample: 16,
+        sample_format: SampleFormat::Int,
+    };
+    let mut cursor = Cursor::new(Vec::new());
+    {
+        let mut writer = WavWriter::new(&mut cursor, spec).unwrap();
+        let frames = (sample_rate as f32 * seconds) as usize;
+        let pad = (sample_rate as f32 * 0.1) as usize;
+        for i in 0..frames + pad * 2 {
+            let value = if i < pad || i >= pad + frames {
+                0
+            } else {
+                let phase = i as f32 * 440.0 * std::f32::consts::TAU / sample_rate as f32;
+                (phase.sin() * 8000.0) as i16
+            };
+            for _ in 0..channels {
+                writer.write_sample(value).unwrap();
+            }
+        }
+        writer.finalize().unwrap();
+    }
+    cursor.into_inner()
+}
+
+fn cases() -> Vec<Case> {
+    let mut cases = Vec::new();
+    for &(label, seconds) in &DURATIONS {
+        for &sample_rate in &SAMPLE_RATES {
+            for &channels in &CHANNELS {
+                let wav = make_wav(sample_rate, channels, seconds);
+                let audio = dsp::decode_wav(&wav).unwrap();
+                cases.push(Case {
+                    name: format!("{label}/{sample_rate}Hz/{channels}ch"),
+                    wav,
+                    audio,
+                });
+            }
+        }
+    }
+    cases
+}
+
+fn bench_stages(c: &mut Criterion) {
+    let cases = cases();
+
+    let mut group = c.benchmark_group("decode");
+    for case in &cases {
+        group.throughput(Throughput::Bytes(case.wav.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(&case.name), case, |b, case| {
+            b.iter(|| dsp::decode_wav(black_box(&case.wav)).unwrap())
+        });
+    }
+    group.finish();
+
+    let mut group = c.benchmark_group("trim");
+    for case in &cases {
+        group.throughput(Throughput::Elements(case.audio.samples.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(&case.name), case, |b, case| {
+            b.iter(|| {
+                dsp::trim_silence(
+                    black_box(&case.audio.samples),
+                    case.audio.channels,
+                    PARAMS.silence_threshold,
+                )
+            })
+        });
+    }
+    group.finish();
+
+    let mut group = c.benchmark_group("gain");
+    for case in &cases {
+        group.throughput(Throughput::Elements(case.audio.samples.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(&case.name), case, |b, case| {
+            b.iter_batched_ref(
+                || case.audio.samples.clone(),
+                |samples| dsp::apply_gain(black_box(samples), PARAMS.gain_db),
+                BatchSize::LargeInput,
+            )
+        });
+    }
+    group.finish();
+
+    let mut group = c.benchmark_group("reverb");
+    for case in &cases {
+        group.throughput(Throughput::Elements(case.audio.samples.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(&case.name), case, |b, case| {
+            b.iter_batched_ref(
+                || case.audio.samples.clone(),
+                |samples| {
+                    dsp::apply_reverb(
+                        black_box(samples),
+                        case.audio.sample_rate,
+                        case.audio.channels,
+                        PARAMS.reverb_delay_ms,
+                        PARAMS.reverb_decay,
+                        PARAMS.reverb_mix,
+                    )
+                },
+                BatchSize::LargeInput,
+            )
+        });
+    }
+    group.finish();
+
+    let mut group = c.benchmark_group("resample");
+    for case in &cases {
+        group.throughput(Throughput::Elements(case.audio.samples.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(&case.name), case, |b, case| {
+            b.iter(|| {
+                dsp::to_discord_pcm(
+                    black_box(&case.audio.samples),
+                    case.audio.sample_rate,
+                    case.audio.channels,
+                )
+            })
+        });
+    }
+    group.finish();
+
+    let mut group = c.benchmark_group("pipeline");
+    for case in &cases {
+        group.throughput(Throughput::Bytes(case.wav.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(&case.name), case, |b, case| {
+            b.iter(|| dsp::process_pipeline(black_box(&case.wav), &PARAMS).unwrap())
+        });
+    }
+    group.finish();
+}
+
+criterion_group! {
+    name = benches;
+    // 長いクリップもあるため標本数を減らして実行時間を抑える
+    config = Criterion::default().sample_size(20);
+    targets = bench_stages
+}
+criterion_main!(benches);
@@ -0,0 +1,246 @@
+//! 音声処理の本体 (Python に依存しない関数群)
+//! Python 拡張 (lib.rs) とベンチマーク (benches/dsp.rs) の両方から呼び出す
+
+use hound::{SampleFormat, WavReader};
+use std::io::Cursor;
+use std::ops::Range;
+
+/// Discord が要求する出力サンプルレート
+pub const DISCORD_SAMPLE_RATE: u32 = 48000;
+
+/// デコード済みの音声 (チャンネルごとに交互に並んだ f32 サンプル)
+pub struct Audio {
+    pub samples: Vec<f32>,
+    pub channels: usize,
+    pub sample_rate: u32,
+}
+
+/// パイプラインの設定値
+#[derive(Clone, Copy, Debug)]
+pub struct PipelineParams {
+    pub gain_db: f32,
+    pub silence_threshold: i16,
+    pub reverb_enabled: bool,
+    pub reverb_delay_ms: u32,
+    pub reverb_decay: f32,
+    pub reverb_mix: f32,
+}
+
+/// デシベル(dB)を振幅倍率に変換する
+pub fn db_to_amplitude(db: f32) -> f32 {
+    10.0f32.powf(db / 20.0)
+}
+
+/// Wavファイルのバイト列をデコードする
+pub fn decode_wav(wav_bytes: &[u8]) -> Result<Audio, hound::Error> {
+    let mut reader = WavReader::new(Cursor::new(wav_bytes))?;
+    let spec = reader.spec();
+
+    // サンプルをf32としてすべて読み込む
+    let samples: Vec<f32> = match spec.sample_format {
+        SampleFormat::Int => reader
+            .samples::<i16>()
+            .map(|s| s.unwrap_or(0) as f32)
+            .collect(),
+        SampleFormat::Float => reader
+            .samples::<f32>()
+            .map(|s| s.unwrap_or(0.0))
+            .collect(),
+    };
+
+    Ok(Audio {
+        samples,
+        channels: spec.channels.max(1) as usize,
+        sample_rate: spec.sample_rate,
+    })
+}
+
+/// 前後の無音を除いた範囲を返す (全チャンネルが閾値以下のフレームを無音とみなす)
+pub fn trim_silence(samples: &[f32], channels: usize, silence_threshold: i16) -> Range<usize> {
+    let threshold = silence_threshold.unsigned_abs() as f32;
+    let is_silence = |frame: &[f32]| frame.iter().all(|s| s.abs() <= threshold);
+
+    let mut start = 0;
+    while start < samples.len() {
+        let end = (start + channels).min(samples.len());
+        if !is_silence(&samples[start..end]) {
+            break;
+        }
+        start += channels;
+    }
+    let start = start.min(samples.len());
+
+    let mut end = samples.len();
+    while end >= start + channels {
+        if !is_silence(&samples[end - channels..end]) {
+            break;
+        }
+        end -= channels;
+    }
+
+    start..end
+}
+
+/// 末尾20msをフェードアウトする
+pub fn fade_out(samples: &mut [f32], sample_rate: u32, channels: usize) {
+    let fade_samples = ((sample_rate as f32 * 0.02) as usize) * channels;
+    let len = samples.len();
+    if len <= fade_samples {
+        return;
+    }
+    let fade_start = len - fade_samples;
+    for (i, s) in samples[fade_start..].iter_mut().enumerate() {
+        *s *= 1.0 - (i as f32 / fade_samples as f32);
+    }
+}
+
+/// 音量調整
+pub fn apply_gain(samples: &mut [f32], gain_db: f32) {
+    let amp = db_to_amplitude(gain_db);
+    for s in samples {
+        *s *= amp;
+    }
+}
+
+/// フィードバックディレイによる簡易リバーブ
+pub fn apply_reverb(
+    samples: &mut [f32],
+    sample_rate: u32,
+    channels: usize,
+    delay_ms: u32,
+    decay: f32,
+    mix: f32,
+) {
+    let delay_samples = ((sample_rate as f32 * delay_ms as f32) / 1000.0) as usize;
+    if delay_samples == 0 {
+        return;
+    }
+
+    // チャンネルごとのリングバッファ
+    let mut buffers: Vec<Vec<f32>> = vec![vec![0.0; delay_samples]; channels];
+    let mut buf_indices = vec![0; channels];
+
+    for (i, sample) in samples.iter_mut().enumerate() {
+        let ch = i % channels;
+        let input_val = *sample;
+
+        let delayed_val = buffers[ch][buf_indices[ch]];
+        let reverb_val = input_val + (delayed_val * decay);
+
+        // バッファ更新
+        buffers[ch][buf_indices[ch]] = reverb_val;
+        buf_indices[ch] = (buf_indices[ch] + 1) % delay_samples;
+
+        // Mix
+        *sample = (input_val * (1.0 - mix)) + (reverb_val * mix);
+    }
+}
+
+/// f32 サンプルを i16 に丸めてリトルエンディアンで書き込む
+#[inline]
+fn push_i16(output_bytes: &mut Vec<u8>, val: f32) {
+    let clamped = val.max(i16::MIN as f32).min(i16::MAX as f32) as i16;
+    output_bytes.extend_from_slice(&clamped.to_le_bytes());
+}
+
+/// 48kHz の入力をリサンプルせずにステレオ16bitへ変換する
+fn passthrough_48k(samples: &[f32], channels: usize) -> Vec<u8> {
+    let frames = samples.len() / channels;
+    let mut output_bytes = Vec::with_capacity(frames * 4);
+
+    if channels == 2 {
+        for &val in &samples[..frames * 2] {
+            push_i16(&mut output_bytes, val);
+        }
+    } else {
+        // モノラルは複製、3ch以上は先頭2chを使う
+        for frame in samples.chunks_exact(channels) {
+            let l_val = frame[0];
+            let r_val = if channels == 1 { l_val } else { frame[1] };
+            push_i16(&mut output_bytes, l_val);
+            push_i16(&mut output_bytes, r_val);
+        }
+    }
+
+    output_bytes
+}
+
+/// Discord の PCM 形式 (48kHz / ステレオ / 16bit リトルエンディアン) へ線形補間で変換する
+/// 入力が既に 48kHz の場合はリサンプルを省略する
+pub fn to_discord_pcm(samples: &[f32], sample_rate: u32, channels: usize) -> Vec<u8> {
+    if sample_rate == DISCORD_SAMPLE_RATE {
+        return passthrough_48k(samples, channels);
+    }
+
+    let ratio = sample_rate as f32 / DISCORD_SAMPLE_RATE as f32;
+    let src_frames = samples.len() / channels;
+    let dst_frames = (src_frames as f32 / ratio).ceil() as usize;
+
+    // 出力バッファ (L, R, L, R...)
+    let mut output_bytes = Vec::with_capacity(dst_frames * 4);
+
+    for i in 0..dst_frames {
+        let src_idx_float = i as f32 * ratio;
+        let src_idx_floor = src_idx_float.floor() as usize;
+        let t = src_idx_float - src_idx_floor as f32;
+
+        if src_idx_floor + 1 >= src_frames {
+            break;
+        }
+
+        // 線形補間
+        let lerp = |offset: usize| {
+            let p0 = samples[src_idx_floor * channels + offset];
+            let p1 = samples[(src_idx_floor + 1) * channels + offset];
+            p0 + (p1 - p0) * t
+        };
+        let (l_val, r_val) = if channels == 1 {
+            let val = lerp(0);
+            (val, val) // モノラル -> ステレオ複製
+        } else {
+            (lerp(0), lerp(1))
+        };
+
+        // i16変換 & リトルエンディアン書き込み
+        push_i16(&mut output_bytes, l_val);
+        push_i16(&mut output_bytes, r_val);
+    }
+
+    output_bytes
+}
+
+/// Decode -> Trim -> Fade -> Gain -> Reverb -> Discord PCM変換 を一括で行う
+/// (末尾の無音パディングは付けない)
+pub fn process_pipeline(wav_bytes: &[u8], params: &PipelineParams) -> Result<Vec<u8>, hound::Error> {
+    let Audio {
+        mut samples,
+        channels,
+        sample_rate,
+    } = decode_wav(wav_bytes)?;
+
+    if samples.is_empty() {
+        return Ok(Vec::new());
+    }
+
+    // 必要部分のみ残す (新しいVecを確保せずに詰める)
+    let range = trim_silence(&samples, channels, params.silence_threshold);
+    samples.truncate(range.end);
+    samples.drain(..range.start);
+
+    fade_out(&mut samples, sample_rate, channels);
+    apply_gain(&mut samples, params.gain_db);
+    if params.reverb_enabled {
+        apply_reverb(
+            &mut samples,
+            sample_rate,
+            channels,
+            params.reverb_delay_ms,
+            params.reverb_decay,
+            params.reverb_mix,
+        );
+    }
+
+    // 無音パディングとフレーム境界の調整は Python 側の再生ソースが行う
+    // (クリップ間の間隔・クロスフェードを再生時に決めるため)
+    Ok(to_discord_pcm(&samples, sample_rate, channels))
+}
@@ -5,7 +5,7 @@ import pathlib
 BASE_DIR = pathlib.Path(__file__).parent
 
 # --- TTSエンジン設定 ---
-TTS_ENGINE = "aivoice"
+TTS_ENGINE = os.getenv("TTS_ENGINE", "aivoice")
 
 # --- A.I.VOICE 設定 ---
 AIVOICE_DLL_PATH = os.getenv(
@@ -20,9 +20,114 @@ AIVOICE_APP_PATH = os.getenv(
 VOICEVOX_URL = os.getenv("VOICEVOX_URL", "http://127.0.0.1:50021")
 VOICEVOX_SPEAKER_ID = int(os.getenv("VOICEVOX_SPEAKER_ID", "3"))
 VOICEVOX_APP_PATH = os.getenv("VOICEVOX_APP_PATH", "")
+# 合成リクエストの受信タイムアウト (秒)
+VOICEVOX_TIMEOUT_SEC = float(os.getenv("VOICEVOX_TIMEOUT_SEC", "30"))
+# エンジンを --enable_cancellable_synthesis で起動した場合に 1 (取り消しで合成も止める)
+VOICEVOX_CANCELLABLE_SYNTHESIS = os.getenv("VOICEVOX_CANCELLABLE_SYNTHESIS", "0") == "1"
+# AudioQuery (読み・アクセント解析結果) をキャッシュする件数 (0で無効)
+VOICEVOX_QUERY_CACHE_SIZE = int(os.getenv("VOICEVOX_QUERY_CACHE_SIZE", "256"))
+# 起動時にモデルを読み込んでおく追加のスタイルID (現在のスタイルは常に対象)
+VOICEVOX_WARMUP_SPEAKERS = [
+    int(value)
+    for value in os.getenv("VOICEVOX_WARMUP_SPEAKERS", "").split(",")
+    if value.strip().isdigit()
+]
+
+# --- エンジンの死活監視 ---
+# 合成が連続して失敗したらエンジンを異常とみなし、この秒数は合成せずに即座に諦める
+TTS_BREAKER_FAILURES = int(os.getenv("TTS_BREAKER_FAILURES", "3"))
+TTS_BREAKER_RESET_SEC = float(os.getenv("TTS_BREAKER_RESET_SEC", "30"))
+# ヘルスチェックの間隔 (秒, 正常時 / 異常時)
+TTS_HEALTH_INTERVAL_SEC = 10
+TTS_HEALTH_RETRY_SEC = 3
+
+# --- エンジンの自動切り替え ---
+# 予備のエンジン (空なら使わない)．指定すると TTS_ENGINE が異常・遅延しているときに
+# 予備のエンジンで合成する (詳細は cogs/tts_engines/composite.py)
+TTS_FALLBACK_ENGINE = os.getenv("TTS_FALLBACK_ENGINE", "").lower()
+# 予備のエンジンで使う声 (TTS_VOICE_MAP_PATH で割り当てていないキャラクター用)
+TTS_FALLBACK_CHARACTER = os.getenv("TTS_FALLBACK_CHARACTER") or None
+# キャラクター・感情ごとの予備のエンジンの声 (JSON)
+TTS_VOICE_MAP_PATH = os.getenv("TTS_VOICE_MAP_PATH", "voice_map.json")
+# メインのエンジンの合成見込み時間が予備よりこれ以上長ければ予備を使う (ミリ秒)
+TTS_FAILOVER_MARGIN_MS = int(os.getenv("TTS_FAILOVER_MARGIN_MS", "1000"))
+# メインのエンジンの合成がこの時間で終わらなければ予備でも合成する (ミリ秒, 0で無効)
+TTS_HEDGE_AFTER_MS = int(os.getenv("TTS_HEDGE_AFTER_MS", "0"))
+
+# 起動時・キャラクター変更時に声をエンジンへ読み込ませておく
+# (最初の読み上げが遅くならないようにする)
+TTS_WARMUP = True
+
+# 合成済み音声のキャッシュの上限 (MB / 件, 0MBで無効)
+AUDIO_CACHE_MAX_MB = 64
+AUDIO_CACHE_MAX_ENTRIES = 512
+# 起動時・キャラクター変更時に固定セリフを事前合成してキャッシュに入れる
+AUDIO_PRERENDER = True
+
+# --- 音声再生設定 ---
+# 連続して読み上げるときの音声間の無音 (ミリ秒)
+AUDIO_CLIP_GAP_MS = 200
+# 音声同士を重ねてつなぐ長さ (ミリ秒, 0で無効。有効時は無音の代わりに使用)
+AUDIO_CROSSFADE_MS = 0
+# キューが空になってから再生セッションを閉じるまでの待機時間 (ミリ秒)
+AUDIO_SESSION_LINGER_MS = 500
+# ギルドごとの読み上げキューの上限 (件)
+SPEECH_QUEUE_MAX_PER_GUILD = 20
+# 上限に達したときの方針 ("drop_oldest" / "drop_lowest" / "reject")
+SPEECH_SHED_POLICY = "drop_lowest"
+# レーンごとの読み上げを諦めるまでの待ち時間 (秒, None で無期限)
+SPEECH_MAX_AGE_SEC = {"alarm": 300, "reply": 60, "ambient": 15}
+# /bye で読み上げの終了を待つ最大時間 (秒)
+BYE_TIMEOUT_SEC = 15
+# 入退室・ミュートなどの状態変化をまとめる時間 (秒)
+VOICE_EVENT_DEBOUNCE_SEC = 1.5
+
+# --- 音声合成の実行設定 ---
+# エンジンごとの同時合成数 (A.I.VOICE はエディタが1つのため1)
+SYNTH_WORKERS = {"aivoice": 1, "voicevox": 2}
+# Rust DSP を実行するスレッド数
+SYNTH_DSP_WORKERS = 1
+# 1以上にすると DSP を別プロセスで実行する (0でスレッド実行)
+SYNTH_DSP_PROCESSES = 0
+# 複数セグメントの返答を1回の合成リクエストにまとめる最大セグメント数
+# (まとめて合成できるエンジンのみ。1で無効)
+SYNTH_BATCH_MAX_SEGMENTS = 8
+
+# --- スラッシュコマンドの同期 ---
+# auto: コマンド定義が前回の同期から変わったときだけ同期する
+# always: 起動のたびに同期する / never: 同期しない
+COMMAND_SYNC = os.getenv("COMMAND_SYNC", "auto").lower()
+# 開発用: 指定したギルドにだけ同期する (グローバルと違い即時反映される)
+DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID") or 0) or None
+# 前回同期したコマンド定義のハッシュの保存先
+COMMAND_SYNC_STATE_PATH = os.getenv("COMMAND_SYNC_STATE_PATH", "command_sync.json")
+
+# --- メトリクス設定 ---
+# Prometheus 形式のメトリクスを公開するポート (0で無効)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# 公開するアドレス (既定ではローカルのみ)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# --- アラーム・タイマー設定 ---
+# 保存先 (SQLite)
+SCHEDULE_DB_PATH = os.getenv("SCHEDULE_DB_PATH", "schedule.db")
+# 停止中に過ぎたアラーム・タイマーを起動時に通知する猶予 (秒)
+SCHEDULE_CATCHUP_GRACE_SEC = 6 * 60 * 60
+# 同時刻の通知を送るときの同時送信数と、全体の制限時間 (秒)
+NOTIFY_FANOUT_CONCURRENCY = 5
+NOTIFY_FANOUT_TIMEOUT_SEC = 30
+# 送信に失敗した通知を再送するまでの秒数 (猶予を過ぎるまで繰り返す)
+NOTIFY_RETRY_SEC = 60
 
 # --- 起動時の初期設定保持用 ---
-STARTUP_CHARACTER = None
+STARTUP_CHARACTER = os.getenv("STARTUP_CHARACTER") or None
+
+# --- 非対話モード (サーバー運用向け) ---
+# 有効にすると起動ウィザードを使わず、TTS_ENGINE / STARTUP_CHARACTER /
+# CHARACTER_PROFILE の環境変数で起動する
+HEADLESS = os.getenv("BOT_HEADLESS", "").lower() in ("1", "true", "yes")
+# characters/ 内の人格設定フォルダ名 (空ならLLMを使用しない)
+CHARACTER_PROFILE = os.getenv("CHARACTER_PROFILE", "")
 
 # --- AIシステム設定 ---
 SYSTEM_PROMPT = """